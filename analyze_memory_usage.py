@@ -10,34 +10,104 @@ import os
 import time
 import psutil
 import gc
+import functools
+import multiprocessing
+import queue
 import argparse
-import matplotlib.pyplot as plt
 import numpy as np
-from memory_profiler import profile
 from pathlib import Path
 
+
+@functools.lru_cache(maxsize=None)
+def _pyplot():
+    """Import and configure pyplot on first use, keeping it out of startup time and baseline RSS"""
+    import matplotlib
+    matplotlib.use('Agg')  # File output only; skip GUI backend probing
+    import matplotlib.pyplot as plt
+    # Dense monitor traces rasterize faster with aggressive path simplification
+    plt.rcParams['path.simplify'] = True
+    plt.rcParams['path.simplify_threshold'] = 1.0
+    return plt
+
 # Import analyzer
 from analyzer import QuickMultiLanguageAnalyzer
 
+
+def _normalize_series(timestamps, memories):
+    """Shift timestamps in place to start at zero; return (timestamps, peak memory, peak index)"""
+    timestamps -= timestamps[0]
+    peak_idx = memories.argmax()
+    return timestamps, memories[peak_idx], peak_idx
+
+
 class MemoryProfiler:
     """Memory profiler class for measuring and recording memory usage"""
     
+    # Fewer snapshots than this get a text-only report
+    MIN_PLOT_SNAPSHOTS = 3
+    
     def __init__(self, output_dir="memory_profiles"):
         """Initialize memory profiler"""
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(parents=True, exist_ok=True)
         self.process = psutil.Process(os.getpid())
-        self.baseline_memory = self.get_memory_usage()
-        self.snapshots = []
+        # Pick the cheapest RSS source once so sampling never branches per tick
+        self._statm_fd = None
+        self._rss_reader = self._select_rss_reader()
+        self.baseline_memory = self.get_memory_usage(force_gc=True)
+        # Snapshots are stored column-wise; capacity doubles when full
+        self.snapshots = {
+            "timestamp": np.empty(64, dtype=np.float64),
+            "memory_mb": np.empty(64, dtype=np.float64),
+            "delta_mb": np.empty(64, dtype=np.float64),
+        }
+        self.snapshot_labels = []
+    
+    def _select_rss_reader(self):
+        """Return a zero-argument callable reading current RSS (MB).
+
+        On Linux this preads /proc/self/statm from a descriptor held until close()
+        (one syscall per sample); elsewhere it falls back to a cached psutil
+        memory_info bound method.
+        """
+        try:
+            fd = os.open('/proc/self/statm', os.O_RDONLY)
+        except OSError:
+            memory_info = self.process.memory_info
+            return lambda: memory_info().rss / 1024 / 1024
+        self._statm_fd = fd
+        
+        page_mb = os.sysconf('SC_PAGE_SIZE') / 1024 / 1024
+        
+        def read_statm():
+            return int(os.pread(fd, 256, 0).split()[1]) * page_mb
+        
+        return read_statm
+    
+    def close(self):
+        """Release the /proc/self/statm descriptor; the profiler cannot sample afterwards"""
+        if self._statm_fd is not None:
+            os.close(self._statm_fd)
+            self._statm_fd = None
+    
+    def __del__(self):
+        # getattr: __init__ may have failed before the descriptor attribute was set
+        if getattr(self, '_statm_fd', None) is not None:
+            self.close()
     
-    def get_memory_usage(self):
-        """Get current memory usage (MB)"""
-        gc.collect()  # Force garbage collection
-        return self.process.memory_info().rss / 1024 / 1024
+    def _read_rss(self):
+        """Read current RSS (MB) without triggering garbage collection"""
+        return self._rss_reader()
     
-    def take_snapshot(self, label=""):
+    def get_memory_usage(self, force_gc=False):
+        """Get current memory usage (MB), optionally forcing garbage collection first"""
+        if force_gc:
+            gc.collect()
+        return self._read_rss()
+    
+    def take_snapshot(self, label="", force_gc=False):
         """Record current memory usage"""
-        current_memory = self.get_memory_usage()
+        current_memory = self.get_memory_usage(force_gc=force_gc)
         delta = current_memory - self.baseline_memory
         timestamp = time.time()
         
@@ -48,29 +118,40 @@ class MemoryProfiler:
             "delta_mb": delta
         }
         
-        self.snapshots.append(snapshot)
+        index = len(self.snapshot_labels)
+        if index == len(self.snapshots["timestamp"]):
+            for key, column in self.snapshots.items():
+                self.snapshots[key] = np.resize(column, index * 2)
+        for key, column in self.snapshots.items():
+            column[index] = snapshot[key]
+        self.snapshot_labels.append(label)
         return snapshot
     
+    def _snapshot_series(self):
+        """Return (timestamps, memories, deltas) views over recorded snapshots"""
+        count = len(self.snapshot_labels)
+        return (self.snapshots["timestamp"][:count],
+                self.snapshots["memory_mb"][:count],
+                self.snapshots["delta_mb"][:count])
+    
     def measure_function(self, func, *args, label="", **kwargs):
         """Measure memory usage during function execution"""
-        # Force garbage collection
-        gc.collect()
-        
-        # Record initial state
+        # Record initial state (collect garbage only at measure points)
         start_time = time.time()
-        start_memory = self.get_memory_usage()
-        start_snapshot = self.take_snapshot(f"{label} - Start")
+        start_snapshot = self.take_snapshot(f"{label} - Start", force_gc=True)
+        start_memory = start_snapshot["memory_mb"]
         
-        # Execute function
-        result = func(*args, **kwargs)
-        
-        # Force garbage collection
-        gc.collect()
+        # Execute function; freeze pre-existing objects so the young generation stays small
+        gc.freeze()
+        try:
+            result = func(*args, **kwargs)
+        finally:
+            gc.unfreeze()
         
         # Record final state
         end_time = time.time()
-        end_memory = self.get_memory_usage()
-        end_snapshot = self.take_snapshot(f"{label} - End")
+        end_snapshot = self.take_snapshot(f"{label} - End", force_gc=True)
+        end_memory = end_snapshot["memory_mb"]
         
         # Calculate differences
         execution_time = end_time - start_time
@@ -95,41 +176,59 @@ class MemoryProfiler:
         }
     
     def continuous_monitor(self, func, *args, interval=0.1, label="", **kwargs):
-        """Continuously monitor memory usage during function execution"""
+        """Continuously monitor memory usage during function execution.
+
+        Returns (result, (times, memories)) where both series are float64 arrays.
+        """
         import threading
         
-        # Monitoring flag
-        monitoring = True
-        memory_data = []
+        # Preallocated sample buffers, grown geometrically so sampling never allocates per tick
+        times = np.empty(1024, dtype=np.float64)
+        memories = np.empty_like(times)
+        count = 0
+        read_rss = self._rss_reader
+        sample_start = time.monotonic()
+        
+        def record_sample():
+            nonlocal times, memories, count
+            if count == len(times):
+                times = np.resize(times, count * 2)
+                memories = np.resize(memories, count * 2)
+            times[count] = time.monotonic() - sample_start
+            memories[count] = read_rss()
+            count += 1
+        
+        # Sample from a thread on wall-clock time so blocked and idle stretches are
+        # covered too; waiting on the stop event lets it exit as soon as monitoring ends
+        stop_event = threading.Event()
         
-        # Monitoring thread
         def monitor_thread():
-            start_time = time.time()
-            while monitoring:
-                current_time = time.time() - start_time
-                current_memory = self.get_memory_usage()
-                memory_data.append((current_time, current_memory))
-                time.sleep(interval)
-        
-        # Start monitoring thread
+            while not stop_event.is_set():
+                record_sample()
+                stop_event.wait(interval)
+        
         thread = threading.Thread(target=monitor_thread)
         thread.daemon = True
         thread.start()
         
+        def stop_sampling():
+            stop_event.set()
+            if thread.is_alive():
+                thread.join()
+        
         try:
             # Execute function
-            start_time = time.time()
+            start_time = time.monotonic()
             result = func(*args, **kwargs)
-            execution_time = time.time() - start_time
+            execution_time = time.monotonic() - start_time
             
             # Stop monitoring
-            monitoring = False
-            thread.join()
+            stop_sampling()
+            times, memories = times[:count], memories[:count]
             
             # Analyze results
-            if memory_data:
-                times, memories = zip(*memory_data)
-                peak_memory = max(memories)
+            if count:
+                peak_memory = memories.max()
                 initial_memory = memories[0]
                 final_memory = memories[-1]
                 memory_increase = final_memory - initial_memory
@@ -143,22 +242,21 @@ class MemoryProfiler:
                 print(f"Peak memory: {peak_memory:.2f} MB")
                 print(f"Final memory: {final_memory:.2f} MB")
                 print(f"Memory increase: {memory_increase:.2f} MB")
-                print(f"Sample points: {len(memory_data)}")
+                print(f"Sample points: {count}")
                 print(f"{'='*60}")
                 
                 # Plot memory usage chart
                 self.plot_memory_usage(times, memories, label)
             
-            return result, memory_data
+            return result, (times, memories)
         
         except Exception as e:
-            monitoring = False
-            if thread.is_alive():
-                thread.join()
+            stop_sampling()
             raise e
     
     def plot_memory_usage(self, times, memories, label=""):
         """Plot memory usage chart"""
+        plt = _pyplot()
         plt.figure(figsize=(12, 6))
         plt.plot(times, memories, 'b-')
         plt.title(f'Memory Usage Over Time - {label}')
@@ -167,11 +265,12 @@ class MemoryProfiler:
         plt.grid(True)
         
         # Add peak marker
-        peak_idx = memories.index(max(memories))
-        plt.plot(times[peak_idx], memories[peak_idx], 'ro')
-        plt.annotate(f'Peak: {memories[peak_idx]:.2f} MB', 
-                    xy=(times[peak_idx], memories[peak_idx]),
-                    xytext=(times[peak_idx]+0.5, memories[peak_idx]+2),
+        _, peak_memory, peak_idx = _normalize_series(
+            np.array(times, dtype=np.float64), np.asarray(memories, dtype=np.float64))
+        plt.plot(times[peak_idx], peak_memory, 'ro')
+        plt.annotate(f'Peak: {peak_memory:.2f} MB', 
+                    xy=(times[peak_idx], peak_memory),
+                    xytext=(times[peak_idx]+0.5, peak_memory+2),
                     arrowprops=dict(facecolor='black', shrink=0.05))
         
         # Save chart
@@ -184,19 +283,47 @@ class MemoryProfiler:
         
         return filepath
     
+    def _write_text_report(self, title, timestamps, labels, memories, deltas):
+        """Write the snapshot table to a text report and return its path"""
+        report_file = self.output_dir / f"memory_report_{int(time.time())}.txt"
+        lines = [
+            title,
+            '=' * 60,
+            f"Baseline memory: {self.baseline_memory:.2f} MB",
+            f"Number of snapshots: {len(labels)}",
+            "",
+            f"{'Time(sec)':<12} {'Label':<30} {'Memory(MB)':<12} {'Growth(MB)':<12}",
+            '-' * 70,
+        ]
+        lines.extend(
+            f"{t:<12.2f} {label:<30} {memory:<12.2f} {delta:<+12.2f}"
+            for t, label, memory, delta in zip(timestamps.tolist(), labels, memories.tolist(), deltas.tolist())
+        )
+        lines.append("")
+        with open(report_file, 'w', encoding='utf-8') as f:
+            f.write("\n".join(lines))
+        
+        print(f"Memory usage text report saved as: {report_file}")
+        
+        return report_file
+    
     def generate_report(self, title="Memory Usage Analysis Report"):
         """Generate memory usage report"""
-        if not self.snapshots:
+        if not self.snapshot_labels:
             print("No memory snapshot data available")
             return
         
         # Extract data
-        timestamps = [s["timestamp"] - self.snapshots[0]["timestamp"] for s in self.snapshots]
-        memories = [s["memory_mb"] for s in self.snapshots]
-        deltas = [s["delta_mb"] for s in self.snapshots]
-        labels = [s["label"] for s in self.snapshots]
+        timestamps, memories, deltas = self._snapshot_series()
+        timestamps, _, _ = _normalize_series(timestamps.copy(), memories)
+        labels = self.snapshot_labels
+        
+        # A chart of one or two points says nothing the text report doesn't; skip the render
+        if len(labels) < self.MIN_PLOT_SNAPSHOTS:
+            return None, self._write_text_report(title, timestamps, labels, memories, deltas)
         
         # Plot memory usage chart
+        plt = _pyplot()
         plt.figure(figsize=(12, 8))
         
         # Plot total memory usage
@@ -231,26 +358,17 @@ class MemoryProfiler:
         
         print(f"Memory usage report saved as: {filepath}")
         
-        # Generate text report
-        report_file = self.output_dir / f"memory_report_{int(time.time())}.txt"
-        with open(report_file, 'w', encoding='utf-8') as f:
-            f.write(f"{title}\n")
-            f.write(f"{'='*60}\n")
-            f.write(f"Baseline memory: {self.baseline_memory:.2f} MB\n")
-            f.write(f"Number of snapshots: {len(self.snapshots)}\n\n")
-            
-            f.write(f"{'Time(sec)':<12} {'Label':<30} {'Memory(MB)':<12} {'Growth(MB)':<12}\n")
-            f.write(f"{'-'*70}\n")
-            
-            for i, snapshot in enumerate(self.snapshots):
-                t = snapshot["timestamp"] - self.snapshots[0]["timestamp"]
-                f.write(f"{t:<12.2f} {snapshot['label']:<30} {snapshot['memory_mb']:<12.2f} {snapshot['delta_mb']:<+12.2f}\n")
-        
-        print(f"Memory usage text report saved as: {report_file}")
+        report_file = self._write_text_report(title, timestamps, labels, memories, deltas)
         
         return filepath, report_file
 
 
+def _read_source(file_path):
+    """Read a source file as UTF-8, ignoring undecodable bytes"""
+    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+        return f.read()
+
+
 def analyze_analyzer_memory_usage(code_dir="code_samples", language="python", model="gpt2"):
     """Analyze memory usage of the analyzer"""
     profiler = MemoryProfiler()
@@ -264,9 +382,7 @@ def analyze_analyzer_memory_usage(code_dir="code_samples", language="python", mo
     
     # Analyze single file
     def analyze_single_file():
-        file_path = f"{code_dir}/{language}/example.py"
-        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-            code = f.read()
+        code = _read_source(f"{code_dir}/{language}/example.py")
         return analyzer.calculate_rule_level_alignment(code, language)
     
     profiler.measure_function(analyze_single_file, label="Analyze Single File")
@@ -286,57 +402,103 @@ def analyze_analyzer_memory_usage(code_dir="code_samples", language="python", mo
     
     # Generate report
     profiler.generate_report(title=f"Analyzer Memory Usage Analysis (Model: {model})")
+    profiler.close()
 
 
-def compare_models_memory_usage(code_dir="code_samples", language="python", models=None):
-    """Compare memory usage of different models"""
-    if models is None:
-        models = ["gpt2", "bert-base-uncased", "roberta-base"]
+def _profile_one_model(model, code_dir, language, result_queue):
+    """Profile one model in a fresh process and put (model, measurements) on result_queue"""
+    print(f"\n{'='*60}")
+    print(f"Testing model: {model}")
+    print(f"{'='*60}")
     
-    results = {}
+    profiler = MemoryProfiler(output_dir=f"memory_profiles/{model}")
     
-    for model in models:
-        print(f"\n{'='*60}")
-        print(f"Testing model: {model}")
-        print(f"{'='*60}")
+    # Initialize analyzer
+    def init_analyzer():
+        return QuickMultiLanguageAnalyzer(model_name=model)
+    
+    try:
+        analyzer_result = profiler.measure_function(init_analyzer, label=f"Initialize Analyzer ({model})")
+        analyzer = analyzer_result["result"]
         
-        profiler = MemoryProfiler(output_dir=f"memory_profiles/{model}")
+        # Analyze single file
+        def analyze_single_file():
+            code = _read_source(f"{code_dir}/{language}/example.py")
+            return analyzer.calculate_rule_level_alignment(code, language)
         
-        # Initialize analyzer
-        def init_analyzer():
-            return QuickMultiLanguageAnalyzer(model_name=model)
+        file_result = profiler.measure_function(analyze_single_file, label=f"Analyze Single File ({model})")
         
-        try:
-            analyzer_result = profiler.measure_function(init_analyzer, label=f"Initialize Analyzer ({model})")
-            analyzer = analyzer_result["result"]
-            
-            # Analyze single file
-            def analyze_single_file():
-                file_path = f"{code_dir}/{language}/example.py"
-                with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                    code = f.read()
-                return analyzer.calculate_rule_level_alignment(code, language)
-            
-            file_result = profiler.measure_function(analyze_single_file, label=f"Analyze Single File ({model})")
-            
-            # Analyze multiple files
-            def analyze_multiple_files():
-                return analyzer.analyze_language_files(code_dir, language)
-            
-            multi_result = profiler.measure_function(analyze_multiple_files, label=f"Analyze Multiple Files ({model})")
-            
-            # Save results
-            results[model] = {
-                "init": analyzer_result,
-                "single_file": file_result,
-                "multiple_files": multi_result
-            }
-            
-            # Generate report
-            profiler.generate_report(title=f"Analyzer Memory Usage Analysis (Model: {model})")
-            
-        except Exception as e:
-            print(f"Error testing model {model}: {e}")
+        # Analyze multiple files
+        def analyze_multiple_files():
+            return analyzer.analyze_language_files(code_dir, language)
+        
+        multi_result = profiler.measure_function(analyze_multiple_files, label=f"Analyze Multiple Files ({model})")
+        
+        # Generate report
+        profiler.generate_report(title=f"Analyzer Memory Usage Analysis (Model: {model})")
+        
+        # Only the measurements cross the process boundary, not the function results
+        def strip(measurement):
+            return {k: v for k, v in measurement.items() if k != "result"}
+        
+        result_queue.put((model, {
+            "init": strip(analyzer_result),
+            "single_file": strip(file_result),
+            "multiple_files": strip(multi_result)
+        }))
+        
+    except Exception as e:
+        print(f"Error testing model {model}: {e}")
+        result_queue.put((model, None))
+    finally:
+        profiler.close()
+
+
+def compare_models_memory_usage(code_dir="code_samples", language="python", models=None, parallel=1):
+    """Compare memory usage of different models.
+
+    Each model is profiled in its own spawned process so its RSS starts clean;
+    up to `parallel` models are profiled at the same time.
+    """
+    if models is None:
+        models = ["gpt2", "bert-base-uncased", "roberta-base"]
+    
+    mp_ctx = multiprocessing.get_context('spawn')
+    result_queue = mp_ctx.Queue()
+    parallel = max(1, parallel)
+    collected = {}
+    
+    for start in range(0, len(models), parallel):
+        procs = [
+            mp_ctx.Process(target=_profile_one_model, args=(model, code_dir, language, result_queue))
+            for model in models[start:start + parallel]
+        ]
+        for proc in procs:
+            proc.start()
+        # Drain the queue before joining so children never block on a full pipe;
+        # stop waiting once every child has exited (e.g. crashed without reporting)
+        pending = len(procs)
+        while pending:
+            try:
+                model, measurements = result_queue.get(timeout=1.0)
+            except queue.Empty:
+                if not any(proc.is_alive() for proc in procs):
+                    break
+                continue
+            collected[model] = measurements
+            pending -= 1
+        for proc in procs:
+            proc.join()
+        # A child may exit right after putting its result, before the pipe was read;
+        # pick up anything still queued before treating a model as failed
+        while True:
+            try:
+                model, measurements = result_queue.get_nowait()
+            except queue.Empty:
+                break
+            collected[model] = measurements
+    
+    results = {model: collected[model] for model in models if collected.get(model)}
     
     # Compare results
     print(f"\n{'='*60}")
@@ -352,6 +514,7 @@ def compare_models_memory_usage(code_dir="code_samples", language="python", mode
         print(f"{model:<20} {init_mem:<20.2f} {single_mem:<20.2f} {multi_mem:<20.2f}")
     
     # Plot comparison chart
+    plt = _pyplot()
     plt.figure(figsize=(12, 8))
     
     # Extract data
@@ -395,11 +558,13 @@ def main():
     parser.add_argument('--compare_models', action='store_true', help='Compare memory usage of different models')
     parser.add_argument('--models', nargs='+', default=['gpt2', 'bert-base-uncased', 'roberta-base'], 
                         help='List of models to compare')
+    parser.add_argument('--parallel_models', type=int, default=1,
+                        help='Number of models to profile concurrently (each in its own process)')
     
     args = parser.parse_args()
     
     if args.compare_models:
-        compare_models_memory_usage(args.code_dir, args.language, args.models)
+        compare_models_memory_usage(args.code_dir, args.language, args.models, parallel=args.parallel_models)
     else:
         analyze_analyzer_memory_usage(args.code_dir, args.language, args.model)
 
@@ -5,118 +5,556 @@ Quick Multilingual Analyzer - Using existing compiled libraries
 """
 
 import os
+import sys
 import json
 import time
 import argparse
 from pathlib import Path
-from collections import defaultdict, Counter
-from typing import Dict, List, Tuple, Optional
-
+from collections import OrderedDict, deque
+from functools import lru_cache
+from typing import Any, Dict, List, Tuple, Optional, Union
+
+import hashlib
+import logging
+import math
+import numpy as np
+try:
+    from numba import njit
+except ImportError:  # numba is optional; the alignment kernel below runs as plain NumPy without it
+    njit = None
+try:
+    import orjson
+except ImportError:  # orjson is optional; NDJSON lines fall back to the stdlib encoder
+    orjson = None
 from tree_sitter import Language, Parser
+try:
+    import tree_sitter_languages
+except ImportError:  # fall back to the hand-built libraries in build/
+    tree_sitter_languages = None
 from transformers import AutoTokenizer
 from tqdm import tqdm
 import warnings
 warnings.filterwarnings('ignore')
 import concurrent.futures
 import multiprocessing
-from typing import Any
 import signal
+import mmap
+import queue
+import threading
+
+logger = logging.getLogger(__name__)
+
+def _json_default(obj: Any) -> Any:
+    """Encoder hook for compact record types that are expanded only at write time."""
+    if isinstance(obj, UnalignedRule):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def _json_line(record: Dict[str, Any]) -> bytes:
+    """Serialize one record as a compact NDJSON line."""
+    if orjson is not None:
+        return orjson.dumps(record, default=_json_default, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_APPEND_NEWLINE)
+    return (json.dumps(record, ensure_ascii=False, default=_json_default) + '\n').encode('utf-8')
+
+# Write buffer for streamed NDJSON results; records reach disk in 1 MiB writes
+JSONL_BUFFER_BYTES = 1 << 20
+
+def _finish_jsonl(jsonl_file, summary: Dict[str, Any]) -> None:
+    """Append the aggregate summary (without its files list) as a final '__summary__' record and close the file."""
+    jsonl_file.write(_json_line({'__summary__': {k: v for k, v in summary.items() if k != 'files'}}))
+    jsonl_file.close()
+
+def _json_document(document: Dict[str, Any], compact: bool = False) -> bytes:
+    """Serialize a report document as indented JSON, or without whitespace when compact."""
+    if orjson is not None:
+        option = orjson.OPT_SERIALIZE_NUMPY if compact else orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_INDENT_2
+        return orjson.dumps(document, default=_json_default, option=option)
+    if compact:
+        # The default ensure_ascii=True is the faster stdlib path
+        return json.dumps(document, separators=(',', ':'), default=_json_default).encode('ascii')
+    return json.dumps(document, ensure_ascii=False, indent=2, default=_json_default).encode('utf-8')
+
+# Single background thread that tokenizes while the calling thread parses;
+# both the fast tokenizer and tree-sitter run native code
+_ENCODE_POOL: Optional[concurrent.futures.ThreadPoolExecutor] = None
+
+def _encode_pool() -> concurrent.futures.ThreadPoolExecutor:
+    global _ENCODE_POOL
+    if _ENCODE_POOL is None:
+        _ENCODE_POOL = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix='encode')
+    return _ENCODE_POOL
+
+# Files larger than this are skipped by pool workers
+MAX_CODE_BYTES = 1 * 1024 * 1024
+
+# workers value that sizes the pool automatically; 0 and other values below 2 run serially
+AUTO_WORKERS = -1
+
+def _use_worker_pool(workers: int) -> bool:
+    return workers > 1 or workers == AUTO_WORKERS
 
 # Global worker analyzer for process pool
 WORKER_ANALYZER: Optional["QuickMultiLanguageAnalyzer"] = None
+WORKER_TIMEOUT_SECS = 10
+
+def _worker_timeout(signum, frame):
+    raise TimeoutError("per-file timeout")
 
-def _worker_init(model_name: str, emit_utf16: bool, target_language: str):
-    global WORKER_ANALYZER
+def _worker_init(model_name: str, emit_utf16: bool, target_language: Optional[str], cache_dir: Optional[str] = None, named_rules_only: bool = False, dedup_cache_size: int = 0):
+    global WORKER_ANALYZER, WORKER_TIMEOUT_SECS
     try:
         os.environ.setdefault('TOKENIZERS_PARALLELISM', 'false')
-        WORKER_ANALYZER = QuickMultiLanguageAnalyzer(model_name=model_name, emit_utf16_offsets=emit_utf16, allowed_languages=[target_language])
+        allowed_languages = [target_language] if target_language else None
+        WORKER_ANALYZER = QuickMultiLanguageAnalyzer(model_name=model_name, emit_utf16_offsets=emit_utf16, allowed_languages=allowed_languages, cache_dir=cache_dir, named_rules_only=named_rules_only, dedup_cache_size=dedup_cache_size)
+        # Read the timeout and install the SIGALRM handler once per worker process
+        WORKER_TIMEOUT_SECS = max(1, int(os.environ.get('ANALYZER_PER_FILE_TIMEOUT', '10')))
+        signal.signal(signal.SIGALRM, _worker_timeout)
     except Exception:
         WORKER_ANALYZER = None
 
-def _worker_analyze_file(args: Tuple[str, str]) -> Optional[Dict[str, Any]]:
-    """Top-level function for ProcessPoolExecutor to avoid pickling parser objects."""
-    global WORKER_ANALYZER
-    file_path_str, language = args
-    file_path = Path(file_path_str)
-    if WORKER_ANALYZER is None:
-        return None
-    try:
-        # timeout support per file (Unix)
-        def _timeout_handler(signum, frame):
-            raise TimeoutError("per-file timeout")
-        old_handler = signal.signal(signal.SIGALRM, _timeout_handler)
-        timeout_secs = int(os.environ.get('ANALYZER_PER_FILE_TIMEOUT', '10'))
-        signal.alarm(max(1, timeout_secs))
-
-        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-            code = f.read()
-        MAX_CODE_BYTES = 1 * 1024 * 1024
-        if len(code.encode('utf-8')) > MAX_CODE_BYTES:
-            signal.alarm(0) 
-            signal.signal(signal.SIGALRM, old_handler)
-            return None 
-        if not code.strip():
-            signal.alarm(0)
-            signal.signal(signal.SIGALRM, old_handler)
-            return None
-        code_size = len(code)
-        file_start_time = time.time()
-        score, details = WORKER_ANALYZER.calculate_rule_level_alignment(code, language)
-        signal.alarm(0)
-        signal.signal(signal.SIGALRM, old_handler)
-        file_analysis_time = time.time() - file_start_time
-        aligned_count = sum(1 for d in details.values() if d['fully_aligned'])
-        unaligned_rules_list = [
+def _rule_key_str(rule: Tuple[str, int, int]) -> str:
+    """Serialized rule key, 'type_start_end', as written to reports."""
+    return f"{rule[0]}_{rule[1]}_{rule[2]}"
+
+class UnalignedRule:
+    """Compact unaligned-rule entry kept for dataset samples; expanded to a report dict when serialized.
+
+    The preview is held as the raw UTF-8 slice from _preview_slice and decoded only then.
+    """
+    __slots__ = ('rule_key', 'start_aligned', 'end_aligned', 'preview')
+
+    def __init__(self, rule_key: Tuple[str, int, int], start_aligned: bool, end_aligned: bool, preview: bytes):
+        self.rule_key = rule_key
+        self.start_aligned = start_aligned
+        self.end_aligned = end_aligned
+        self.preview = preview
+
+    def __reduce__(self):
+        return UnalignedRule, (self.rule_key, self.start_aligned, self.end_aligned, self.preview)
+
+    def to_dict(self) -> Dict[str, Any]:
+        rule_type, start_byte, end_byte = self.rule_key
+        return {
+            'rule_key': _rule_key_str(self.rule_key),
+            'type': rule_type,
+            'start_byte': start_byte,
+            'end_byte': end_byte,
+            'start_aligned': self.start_aligned,
+            'end_aligned': self.end_aligned,
+            'fully_aligned': False,
+            'text_preview': _decode_preview(self.preview)
+        }
+
+def _build_file_result(file_path: Union[str, Path], score: float, aligned_count: int, total_count: int, details: Optional[Dict], code_size: int, analysis_time: Optional[float], mark_perfect: bool = True) -> Dict[str, Any]:
+    """Per-file result record shared by the serial and process-pool paths.
+
+    details=None (counts-only analysis) leaves out the unaligned_rules list.
+    mark_perfect=False leaves out 'is_perfect', so the record is reported even
+    when every rule is aligned.
+    """
+    unaligned_rules_list = None if details is None else [
+        {
+            'rule_key': _rule_key_str(rk),
+            'type': rd.get('type'),
+            'start_byte': rd.get('start_byte'),
+            'end_byte': rd.get('end_byte'),
+            'start_aligned': rd.get('start_aligned'),
+            'end_aligned': rd.get('end_aligned'),
+            'crossing_start': rd.get('crossing_start'),
+            'crossing_end': rd.get('crossing_end'),
+            'crossing_start_reason': rd.get('crossing_start_reason'),
+            'crossing_end_reason': rd.get('crossing_end_reason'),
+            'token_start_context': rd.get('token_start_context'),
+            'token_end_context': rd.get('token_end_context'),
+            'explain_tree_sitter': rd.get('explain_tree_sitter'),
+            'explain_tokenizer': rd.get('explain_tokenizer'),
+            'fully_aligned': rd.get('fully_aligned'),
+            'text_preview': rd.get('text_preview')
+        }
+        for rk, rd in details.items()
+    ]
+    result = {
+        'file': os.path.basename(file_path),
+        'path': os.fspath(file_path),
+        'score': score,
+        'total_rules': total_count,
+        'aligned_rules': aligned_count,
+        'unaligned_rules': unaligned_rules_list,
+        'code_size': code_size,
+        'analysis_time': analysis_time,
+        'processing_speed': code_size / analysis_time if analysis_time else 0,
+        'is_perfect': aligned_count == total_count
+    }
+    if not mark_perfect:
+        del result['is_perfect']
+    if unaligned_rules_list is None:
+        del result['unaligned_rules']
+    if analysis_time is None:
+        del result['analysis_time']
+        del result['processing_speed']
+    return result
+
+# Unaligned-rule fields a pool worker sends back; rule_key, the *_aligned flags and
+# explain_tree_sitter follow from these, and explain_tokenizer is shared per file
+_PACKED_RULE_FIELDS = ('type', 'start_byte', 'end_byte', 'crossing_start', 'crossing_end',
+                       'crossing_start_reason', 'crossing_end_reason',
+                       'token_start_context', 'token_end_context', 'text_preview')
+
+def _pack_file_result(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Replace unaligned_rules with (explain_tokenizer, row tuples) for a smaller pickle."""
+    rules = result.get('unaligned_rules')
+    if rules:
+        result['unaligned_rules'] = (rules[0]['explain_tokenizer'], [tuple(rule[field] for field in _PACKED_RULE_FIELDS) for rule in rules])
+    return result
+
+def _unpack_file_result(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Inverse of _pack_file_result; rebuilds the records _build_file_result produces."""
+    packed = result.get('unaligned_rules')
+    if isinstance(packed, tuple):
+        explain_tokenizer, rows = packed
+        result['unaligned_rules'] = [
             {
-                'rule_key': rk,
-                'type': rd.get('type'),
-                'start_byte': rd.get('start_byte'),
-                'end_byte': rd.get('end_byte'),
-                'start_aligned': rd.get('start_aligned'),
-                'end_aligned': rd.get('end_aligned'),
-                'crossing_start': rd.get('crossing_start'),
-                'crossing_end': rd.get('crossing_end'),
-                'crossing_start_reason': rd.get('crossing_start_reason'),
-                'crossing_end_reason': rd.get('crossing_end_reason'),
-                'token_start_context': rd.get('token_start_context'),
-                'token_end_context': rd.get('token_end_context'),
-                'explain_tree_sitter': rd.get('explain_tree_sitter'),
-                'explain_tokenizer': rd.get('explain_tokenizer'),
-                'fully_aligned': rd.get('fully_aligned'),
-                'text_preview': rd.get('text_preview')
+                'rule_key': f"{rule_type}_{start_byte}_{end_byte}",
+                'type': rule_type,
+                'start_byte': start_byte,
+                'end_byte': end_byte,
+                'start_aligned': not crossing_start,
+                'end_aligned': not crossing_end,
+                'crossing_start': crossing_start,
+                'crossing_end': crossing_end,
+                'crossing_start_reason': crossing_start_reason,
+                'crossing_end_reason': crossing_end_reason,
+                'token_start_context': token_start_context,
+                'token_end_context': token_end_context,
+                'explain_tree_sitter': f"Tree-sitter node '{rule_type}' spans bytes [{start_byte}, {end_byte}) from node.start_byte/end_byte.",
+                'explain_tokenizer': explain_tokenizer,
+                'fully_aligned': False,
+                'text_preview': text_preview
             }
-            for rk, rd in details.items() if not rd.get('fully_aligned')
+            for (rule_type, start_byte, end_byte, crossing_start, crossing_end, crossing_start_reason,
+                 crossing_end_reason, token_start_context, token_end_context, text_preview) in rows
         ]
-        return {
-            'file': file_path.name,
-            'path': str(file_path),
-            'score': score,
-            'total_rules': len(details),
-            'aligned_rules': aligned_count,
-            'unaligned_rules': unaligned_rules_list,
-            'code_size': code_size,
-            'analysis_time': file_analysis_time,
-            'processing_speed': code_size / file_analysis_time if file_analysis_time > 0 else 0,
-            'is_perfect': len(unaligned_rules_list) == 0
-        }
-    except TimeoutError:
+    return result
+
+def _read_code_file(file_path: Union[str, Path], max_bytes: Optional[int] = None) -> Tuple[str, Union[bytes, mmap.mmap]]:
+    """Read a source file once, returning (text, utf-8 bytes of that text).
+
+    Clean UTF-8 files with '\n' line endings come back as a read-only mmap, so the
+    parser reads the page cache directly instead of a second in-memory copy.
+    Files larger than max_bytes raise ValueError before anything is mapped.
+    """
+    with open(file_path, 'rb') as f:
+        file_size = os.fstat(f.fileno()).st_size
+        if max_bytes is not None and file_size > max_bytes:
+            raise ValueError(f"{file_path} exceeds {max_bytes} bytes")
+        if file_size == 0:
+            return '', b''
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if mapped.find(b'\r') == -1:
         try:
-            signal.alarm(0)
-            signal.signal(signal.SIGALRM, old_handler)
-        except Exception:
+            return str(mapped, 'utf-8'), mapped
+        except UnicodeDecodeError:
             pass
-        return None
-    except Exception:
-        return None
+    code_bytes = mapped[:]
+    mapped.close()
+    if b'\r' in code_bytes:
+        # Match text-mode universal newlines so offsets agree with open(..., 'r')
+        code_bytes = code_bytes.replace(b'\r\n', b'\n').replace(b'\r', b'\n')
+    try:
+        code = code_bytes.decode('utf-8')
+    except UnicodeDecodeError:
+        code = code_bytes.decode('utf-8', errors='ignore')
+        code_bytes = code.encode('utf-8')
+    return code, code_bytes
+
+_PREFETCH_DONE = object()
+
+def _prefetch_iter(iterable, maxsize: int):
+    """Iterate `iterable` on a background thread, keeping up to maxsize items ready ahead of the consumer.
+
+    Exceptions raised by the producer are re-raised in the consumer; closing the
+    generator early stops the producer.
+    """
+    buffer: queue.Queue = queue.Queue(maxsize=maxsize)
+    stop = threading.Event()
+
+    def put(entry) -> bool:
+        while not stop.is_set():
+            try:
+                buffer.put(entry, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put((item, None)):
+                    return
+        except BaseException as exc:
+            put((_PREFETCH_DONE, exc))
+            return
+        put((_PREFETCH_DONE, None))
+
+    producer = threading.Thread(target=produce, name='dataset-prefetch', daemon=True)
+    producer.start()
+    try:
+        while True:
+            item, exc = buffer.get()
+            if item is _PREFETCH_DONE:
+                if exc is not None:
+                    raise exc
+                return
+            yield item
+    finally:
+        stop.set()
+
+def _prefetch_files(file_paths: List[str]) -> None:
+    """Ask the kernel to start reading file_paths into the page cache without waiting for it."""
+    if not hasattr(os, 'posix_fadvise'):
+        return
+    for file_path in file_paths:
+        try:
+            fd = os.open(file_path, os.O_RDONLY)
+        except OSError:
+            continue
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+
+def _worker_analyze_group(args: Tuple[List[str], str, bool, bool, Optional[List[str]]]) -> Tuple[int, List[Dict[str, Any]]]:
+    """Pool task: analyze a group of files with one batched tokenizer call; returns (files attempted, results)."""
+    file_paths, language, detailed, timing, prefetch_paths = args
+    if WORKER_ANALYZER is None:
+        return len(file_paths), []
+    results = WORKER_ANALYZER._analyze_file_group(
+        file_paths, language, detailed=detailed, timing=timing,
+        file_timeout=WORKER_TIMEOUT_SECS, max_code_bytes=MAX_CODE_BYTES,
+        prefetch_paths=prefetch_paths
+    )
+    return len(file_paths), [_pack_file_result(result) for result in results]
+
+def _worker_analyze_samples(args: Tuple[List[Tuple[Any, str, None]], str]) -> List[Tuple]:
+    """Pool task for the HF dataset path: analyze one language's batch of (sample_id, code, None) samples."""
+    samples, language = args
+    if WORKER_ANALYZER is None:
+        return []
+    return WORKER_ANALYZER._analyze_sample_batch(samples, language, file_timeout=WORKER_TIMEOUT_SECS)
+
+# Files found per (code_dir, language) by analyze_language_files, so --models runs
+# walk each directory once per process
+_CODE_FILES_CACHE: Dict[Tuple[str, str], List[str]] = {}
+
+def _find_code_files(root: Path, extensions: List[str], recursive: bool = True) -> List[str]:
+    """Collect files ending in any of extensions with a single directory walk.
+
+    Results are grouped by extension in the given order, each group in walk
+    order, matching the previous per-extension (r)glob concatenation. Paths are
+    plain strings: cheaper to build and to pickle into the worker pool.
+    """
+    buckets = {ext: [] for ext in extensions}
+    suffixes = tuple(extensions)
+    walker = os.walk(root) if recursive else [next(os.walk(root), (str(root), [], []))]
+    for dirpath, _, filenames in walker:
+        for name in filenames:
+            if name.endswith(suffixes):
+                ext = next(e for e in extensions if name.endswith(e))
+                buckets[ext].append(os.path.join(dirpath, name))
+    return [path for ext in extensions for path in buckets[ext]]
+
+def _char_to_byte_offsets(code: str, code_bytes: bytes) -> np.ndarray:
+    """Map each character index of code (plus the end position) to its UTF-8 byte offset."""
+    if len(code_bytes) == len(code):
+        # Pure ASCII: character and byte offsets coincide
+        return np.arange(len(code) + 1, dtype=np.int64)
+    # Characters start at every byte that is not a UTF-8 continuation byte (10xxxxxx)
+    byte_values = np.frombuffer(code_bytes, dtype=np.uint8)
+    offsets = np.empty(len(code) + 1, dtype=np.int64)
+    offsets[:-1] = np.flatnonzero((byte_values & 0xC0) != 0x80)
+    offsets[-1] = len(code_bytes)
+    return offsets
+
+def _byte_to_utf16_offsets(code_bytes: bytes, char_to_byte: np.ndarray) -> np.ndarray:
+    """UTF-16 code unit index for every byte offset 0..len(code_bytes); interior bytes map to their character's start."""
+    byte_values = np.frombuffer(code_bytes, dtype=np.uint8)
+    # Characters outside the BMP (4-byte UTF-8, lead byte >= 0xF0) take a surrogate pair
+    units = 1 + (byte_values[char_to_byte[:-1]] >= 0xF0)
+    utf16_starts = np.zeros(len(units) + 1, dtype=np.int64)
+    np.cumsum(units, out=utf16_starts[1:])
+    return np.append(np.repeat(utf16_starts[:-1], np.diff(char_to_byte)), utf16_starts[-1])
+
+def _language_summary_text(heading: str, result: Dict[str, Any]) -> str:
+    """Per-language summary block, built as one string so it reaches stdout in a single write."""
+    return (
+        f"\n{heading} Analysis Summary:\n"
+        f"  File count: {result['file_count']}\n"
+        f"  Average score: {result['avg_score']:.2f}%\n"
+        f"  Total rules: {result['total_rules']}\n"
+        f"  Total aligned: {result['total_aligned']}\n"
+        f"  Overall alignment rate: {result['overall_alignment']:.2f}%\n"
+        f"  Total code size: {result['total_code_size']/1024:.2f} KB\n"
+        f"  Total analysis time: {result['total_analysis_time']:.2f} seconds\n"
+        f"  Average processing speed: {result['avg_processing_speed']/1024:.2f} KB/sec\n"
+    )
+
+def _rank_by(results: Dict[str, Dict], field: str) -> List[Tuple[str, Dict]]:
+    """(language, result) pairs by descending results[...][field]; ties keep insertion order."""
+    items = list(results.items())
+    values = np.fromiter((result[field] for _, result in items), dtype=np.float64, count=len(items))
+    return [items[i] for i in np.argsort(-values, kind='stable').tolist()]
+
+def _rankings_text(results: Dict[str, Dict], overall_time: float) -> Tuple[List, str]:
+    """Score rankings plus the score and speed ranking tables as one string."""
+    rankings = _rank_by(results, 'avg_score')
+    lines = [f"\n{'='*60}", "Language Rankings (by average score)", f"{'='*60}"]
+    for i, (lang, result) in enumerate(rankings, 1):
+        lines.append(f"{i:2d}. {lang:<12} {result['avg_score']:6.2f}% "
+                     f"(Files: {result['file_count']}, Rules: {result['total_rules']})")
+    lines.append(f"\nTotal analysis time: {overall_time:.2f} seconds")
+    lines += [f"\n{'='*60}", "Language Processing Speed Rankings (KB/sec)", f"{'='*60}"]
+    speed_rankings = _rank_by(results, 'avg_processing_speed')
+    for i, (lang, result) in enumerate(speed_rankings, 1):
+        lines.append(f"{i:2d}. {lang:<12} {result['avg_processing_speed']/1024:.2f} KB/sec "
+                     f"(Total size: {result['total_code_size']/1024:.2f} KB)")
+    lines.append('')
+    return rankings, '\n'.join(lines)
+
+# Characters shown in text previews
+PREVIEW_CHARS = 50
+
+def _preview_slice(code_bytes: bytes, start: int, end: int) -> bytes:
+    """The bytes of code_bytes[start:end] that _decode_preview needs for its PREVIEW_CHARS characters."""
+    # PREVIEW_CHARS chars take at most 4 bytes each, plus up to 3 stray continuation bytes dropped at start
+    return code_bytes[start:min(end, start + 4 * PREVIEW_CHARS + 3)]
+
+def _decode_preview(preview: bytes) -> str:
+    return preview.decode('utf-8', errors='ignore')[:PREVIEW_CHARS]
+
+def _text_preview(code_bytes: bytes, start: int, end: int) -> str:
+    """First PREVIEW_CHARS characters of code_bytes[start:end] without decoding the whole span."""
+    return _decode_preview(_preview_slice(code_bytes, start, end))
+
+def _containing_token_indices(token_starts: np.ndarray, token_ends: np.ndarray, positions: np.ndarray) -> List[int]:
+    """Index of the token strictly containing each byte position, or -1 (token_ends must be sorted)."""
+    if len(token_ends) == 0:
+        return [-1] * len(positions)
+    idx = np.searchsorted(token_ends, positions, side='right')
+    # Clamp instead of masking so the start comparison runs over the whole array at once
+    found = idx < len(token_ends)
+    found &= token_starts[np.minimum(idx, len(token_ends) - 1)] < positions
+    return np.where(found, idx, -1).tolist()
+
+def _first_containing_token_indices(token_starts: np.ndarray, token_ends: np.ndarray, positions: np.ndarray, wanted: np.ndarray, chunk: int = 64) -> List[int]:
+    """First token (in token order) strictly containing each wanted position, or -1; works for unsorted tokens.
+
+    Compares chunk positions against all tokens at once, bounding the
+    temporary boolean matrix to chunk x len(tokens).
+    """
+    result = np.full(len(positions), -1, dtype=np.int64)
+    todo = np.flatnonzero(wanted) if len(token_starts) else np.empty(0, dtype=np.int64)
+    for lo in range(0, len(todo), chunk):
+        rows = todo[lo:lo + chunk]
+        pos = positions[rows][:, None]
+        contains = (token_starts < pos) & (pos < token_ends)
+        found = contains.any(axis=1)
+        result[rows[found]] = contains[found].argmax(axis=1)
+    return result.tolist()
+
+# Word characters for mid-word detection: ASCII alnum and '_' (non-ASCII resolved via str.isalnum).
+# Index 127 (DEL) is not a word character, so code points clamped to 127 read as False.
+_ASCII_WORD_CHARS = np.array([chr(c).isalnum() or chr(c) == '_' for c in range(128)], dtype=np.bool_)
+
+def _word_split_mask(code: str, code_bytes: Union[bytes, mmap.mmap], char_to_byte: np.ndarray) -> np.ndarray:
+    """Boolean mask over byte offsets 0..len(code_bytes) marking positions between two word characters."""
+    split_mask = np.zeros(len(code_bytes) + 1, dtype=np.bool_)
+    if len(code) < 2:
+        return split_mask
+    if len(code_bytes) == len(code):
+        # Pure ASCII: look the bytes up directly; byte and character offsets coincide
+        is_word = _ASCII_WORD_CHARS[np.frombuffer(code_bytes, dtype=np.uint8)]
+        np.logical_and(is_word[:-1], is_word[1:], out=split_mask[1:-1])
+        return split_mask
+    codepoints = np.frombuffer(code.encode('utf-32-le'), dtype=np.uint32)
+    is_word = _ASCII_WORD_CHARS[np.minimum(codepoints, 127)]
+    wide_mask = codepoints >= 128
+    wide = codepoints[wide_mask]
+    word_codepoints = [cp for cp in np.unique(wide).tolist() if chr(cp).isalnum()]
+    is_word[wide_mask] = np.isin(wide, np.asarray(word_codepoints, dtype=np.uint32))
+    between = is_word[:-1] & is_word[1:]
+    split_mask[char_to_byte[1:len(code)][between]] = True
+    return split_mask
+
+def _midword_flags(split_mask, rule_starts, rule_ends):
+    """Return (aligned_count, mid_word_start, mid_word_end) for rule byte spans."""
+    mid_word_start = split_mask[rule_starts]
+    mid_word_end = split_mask[rule_ends]
+    aligned_count = np.count_nonzero(~(mid_word_start | mid_word_end))
+    return aligned_count, mid_word_start, mid_word_end
+
+if njit is not None:
+    _midword_flags = njit(cache=True)(_midword_flags)
+
+# Grammars loaded in this process, (source, symbol) -> (Language, grammar version); shared by
+# every analyzer so --models runs load each grammar once
+_GRAMMAR_CACHE: Dict[Tuple[str, str], Tuple[Language, str]] = {}
+
+def _cached_grammar(source: str, symbol: str, load) -> Tuple[Language, str]:
+    """Return the (Language, version) for symbol from source, calling load() only on first use."""
+    grammar = _GRAMMAR_CACHE.get((source, symbol))
+    if grammar is None:
+        grammar = _GRAMMAR_CACHE[(source, symbol)] = load()
+    return grammar
+
+_LANGUAGE_ALIASES = {
+    'python': 'python', 'py': 'python',
+    'javascript': 'javascript', 'js': 'javascript', 'node': 'javascript',
+    'typescript': 'typescript', 'ts': 'typescript',
+    'java': 'java',
+    'c': 'c',
+    'c++': 'cpp', 'cpp': 'cpp', 'cxx': 'cpp',
+    'c#': 'csharp', 'csharp': 'csharp', 'cs': 'csharp',
+    'go': 'go', 'golang': 'go',
+    'ruby': 'ruby', 'rb': 'ruby',
+    'rust': 'rust', 'rs': 'rust',
+    'scala': 'scala'
+}
+
+@lru_cache(maxsize=4096)
+def _normalize_language_label(raw_language: str) -> Optional[str]:
+    """Internal language key for a dataset language label; datasets repeat a handful of labels, so results are cached."""
+    return _LANGUAGE_ALIASES.get(raw_language.strip().lower())
 
 class QuickMultiLanguageAnalyzer:
     """Quick Multilingual Analyzer - Using compiled libraries"""
+
+    # Parsed rule lists kept in memory per analyzer (one per worker process)
+    RULES_CACHE_SIZE = 128
+    # Parallel runs below this many files use threads in this process instead of a process pool
+    THREAD_POOL_MAX_FILES = 10_000
+    # Skip the "results saved" message for every flush_every/batch part file
+    QUIET_CHUNKS = True
+    # HF dataset flushes: a language is written out once this much sample code has been collected
+    FLUSH_TARGET_BYTES = 64 * 1024 * 1024
     
-    def __init__(self, model_name: str = "gpt2", emit_utf16_offsets: bool = False, allowed_languages: Optional[List[str]] = None):
+    def __init__(self, model_name: str = "gpt2", emit_utf16_offsets: bool = False, allowed_languages: Optional[List[str]] = None, cache_dir: Optional[str] = None, named_rules_only: bool = False, dedup_cache_size: int = 0):
         self.model_name = model_name
-        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        # Fast (Rust) tokenizers return character offsets directly via offset_mapping
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name, use_fast=True)
+        if not self.tokenizer.is_fast:
+            raise ValueError(f"No fast tokenizer available for {model_name}; token offsets require one")
         self.emit_utf16_offsets = emit_utf16_offsets
+        # Count only named nodes as rules, skipping anonymous terminals (keywords, punctuation)
+        self.named_rules_only = named_rules_only
         self.allowed_languages = set(allowed_languages) if allowed_languages else None
+        # Optional on-disk cache of parse rules + token offsets, keyed by content hash
+        self.cache_dir = str(cache_dir) if cache_dir else None
+        self._cache_write_warned = False
+        if self.cache_dir:
+            Path(self.cache_dir).mkdir(parents=True, exist_ok=True)
         
         # Language configurations
         self.language_configs = {
@@ -135,6 +573,18 @@ class QuickMultiLanguageAnalyzer:
         
         self.parsers = {}
         self.languages = {}
+        self.available_languages = []
+        self.grammar_versions = {}
+        self.rule_kind_names = {}
+        # (language, content digest) -> extracted rules, least recently used first
+        self.rules_cache = OrderedDict()
+        self._rules_cache_lock = threading.Lock()
+        # (language, content digest) -> dataset sample result, least recently used first; 0 disables
+        self.dedup_cache_size = dedup_cache_size
+        self.alignment_cache = OrderedDict()
+        # Per-thread Parser objects for the thread-pool path (Language is shareable, Parser is not)
+        self._thread_local = threading.local()
+        self._thread_parse_timeout_micros = 0
         self._setup_parsers()
     
     def _normalize_language_name(self, raw_language: Optional[str]) -> Optional[str]:
@@ -144,336 +594,638 @@ class QuickMultiLanguageAnalyzer:
         """
         if not raw_language:
             return None
-        name = str(raw_language).strip().lower()
-        aliases = {
-            'python': 'python', 'py': 'python',
-            'javascript': 'javascript', 'js': 'javascript', 'node': 'javascript',
-            'typescript': 'typescript', 'ts': 'typescript',
-            'java': 'java',
-            'c': 'c',
-            'c++': 'cpp', 'cpp': 'cpp', 'cxx': 'cpp',
-            'c#': 'csharp', 'csharp': 'csharp', 'cs': 'csharp',
-            'go': 'go', 'golang': 'go',
-            'ruby': 'ruby', 'rb': 'ruby',
-            'rust': 'rust', 'rs': 'rust',
-            'scala': 'scala'
-        }
-        return aliases.get(name)
+        if isinstance(raw_language, str):
+            return _normalize_language_label(raw_language)
+        return _LANGUAGE_ALIASES.get(str(raw_language).strip().lower())
 
     def _setup_parsers(self):
-        """Set up parsers - Using existing compiled libraries"""
+        """Discover which languages have a grammar source; parsers are loaded on first use by _get_parser"""
         # Resolve build directory relative to this script's directory for robustness
         script_dir = Path(__file__).resolve().parent
-        build_dir = script_dir / 'build'
-        
-        if not build_dir.exists():
+        self.build_dir = script_dir / 'build'
+        if tree_sitter_languages is None and not self.build_dir.exists():
             print("Error: build directory does not exist")
             return
         
-        print("Loading compiled language libraries...")
-        
-        # Try to initialize each language (respect allowed_languages if provided)
-        for lang_name, config in self.language_configs.items():
+        for lang_name in self.language_configs:
             if self.allowed_languages is not None and lang_name not in self.allowed_languages:
                 continue
+            # The wheel bundles every configured grammar; otherwise probe build/ without loading
+            if tree_sitter_languages is not None or self._find_library(lang_name) is not None:
+                self.available_languages.append(lang_name)
+            else:
+                print(f"✗ {lang_name} language library file does not exist")
+
+    def _find_library(self, lang_name: str) -> Optional[Path]:
+        """Return the first compiled library in build/ that may hold lang_name's grammar."""
+        possible_paths = [
+            self.build_dir / f"languages_{lang_name}.so",
+            self.build_dir / f"languages.so",
+            self.build_dir / f"multilang_languages.so"
+        ]
+        for path in possible_paths:
+            if path.exists():
+                return path
+        return None
+
+    def _load_parser(self, lang_name: str) -> Optional[Parser]:
+        """Load one language - prefer the prebuilt tree_sitter_languages wheel, else compiled libraries in build/"""
+        symbol = self.language_configs[lang_name]['symbol']
+        if tree_sitter_languages is not None:
             try:
-                # Find corresponding language library file
-                possible_paths = [
-                    build_dir / f"languages_{lang_name}.so",
-                    build_dir / f"languages.so",
-                    build_dir / f"multilang_languages.so"
-                ]
-                
-                library_path = None
-                for path in possible_paths:
-                    if path.exists():
-                        library_path = path
-                        break
-                
-                if not library_path:
-                    print(f"✗ {lang_name} language library file does not exist")
-                    continue
-                
+                language, version = _cached_grammar('tree_sitter_languages', symbol, lambda: (
+                    tree_sitter_languages.get_language(symbol),
+                    f"tree_sitter_languages:{getattr(tree_sitter_languages, '__version__', 'unknown')}"))
                 parser = Parser()
-                language = Language(str(library_path), config['symbol'])
                 parser.set_language(language)
-                
                 self.parsers[lang_name] = parser
                 self.languages[lang_name] = language
-                print(f"✓ {lang_name} parser available (using {library_path.name})")
-                
+                self.grammar_versions[lang_name] = version
+                print(f"✓ {lang_name} parser available (using tree_sitter_languages)")
+                return parser
             except Exception as e:
-                print(f"✗ {lang_name} parser unavailable: {e}")
+                print(f"✗ {lang_name} parser unavailable from tree_sitter_languages: {e}")
+        
+        # Anything the wheel could not provide is still looked up in build/
+        library_path = self._find_library(lang_name)
+        if not library_path:
+            print(f"✗ {lang_name} language library file does not exist")
+            return None
+        def load_library():
+            language = Language(str(library_path), symbol)
+            # Identifies the compiled grammar for cache keys; a rebuilt library invalidates entries
+            lib_stat = library_path.stat()
+            return language, f"{library_path.name}:{lib_stat.st_size}:{lib_stat.st_mtime_ns}"
+        try:
+            language, version = _cached_grammar(str(library_path), symbol, load_library)
+            parser = Parser()
+            parser.set_language(language)
+            
+            self.parsers[lang_name] = parser
+            self.languages[lang_name] = language
+            self.grammar_versions[lang_name] = version
+            print(f"✓ {lang_name} parser available (using {library_path.name})")
+            return parser
+        except Exception as e:
+            print(f"✗ {lang_name} parser unavailable: {e}")
+            return None
+
+    def _get_parser(self, lang_name: str) -> Optional[Parser]:
+        """Return the parser for lang_name, loading it on first use; None if unsupported."""
+        parser = self.parsers.get(lang_name)
+        if parser is None and lang_name in self.available_languages:
+            parser = self._load_parser(lang_name)
+            if parser is None:
+                self.available_languages.remove(lang_name)
+        return parser
     
+    def _thread_parser(self, lang_name: str) -> Optional[Parser]:
+        """Return a parser owned by the calling thread; the main thread uses the shared one."""
+        parser = self._get_parser(lang_name)
+        if parser is None or threading.current_thread() is threading.main_thread():
+            return parser
+        parsers = getattr(self._thread_local, 'parsers', None)
+        if parsers is None:
+            parsers = self._thread_local.parsers = {}
+        parser = parsers.get(lang_name)
+        if parser is None:
+            parser = Parser()
+            parser.set_language(self.languages[lang_name])
+            if self._thread_parse_timeout_micros:
+                parser.set_timeout_micros(self._thread_parse_timeout_micros)
+            parsers[lang_name] = parser
+        return parser
+
     def get_available_languages(self) -> List[str]:
-        """Get list of available languages"""
-        return list(self.parsers.keys())
+        """Get list of available languages (grammar found; parser loaded on first use)"""
+        return list(self.available_languages)
+
+    def _rule_kind_names(self, language: str) -> Dict[int, str]:
+        """Map kind_id -> type name for node kinds counted as rules (non-empty, non-ERROR, named if named_rules_only), built once per grammar."""
+        kind_names = self.rule_kind_names.get(language)
+        if kind_names is None:
+            lang = self.languages[language]
+            kind_names = {}
+            for kind_id in range(lang.node_kind_count):
+                name = lang.node_kind_for_id(kind_id)
+                if name and not name.startswith('ERROR') and (not self.named_rules_only or lang.node_kind_is_named(kind_id)):
+                    kind_names[kind_id] = name
+            self.rule_kind_names[language] = kind_names
+        return kind_names
+
+    def _cache_path(self, code_bytes: bytes, language: str) -> Path:
+        """Content-addressed cache file for this code under the current model and grammar."""
+        h = hashlib.blake2b(digest_size=20)
+        for part in (self.model_name, language, self.grammar_versions.get(language, ''), 'named' if self.named_rules_only else 'all'):
+            h.update(part.encode('utf-8'))
+            h.update(b'\0')
+        h.update(code_bytes)
+        return Path(self.cache_dir) / f"{h.hexdigest()}.npz"
+
+    def _load_cached_parse(self, cache_path: Path):
+        """Return (rules, offset_mapping) from a cache file, or None if missing/unreadable."""
+        try:
+            with np.load(cache_path) as data:
+                rules = list(zip(data['node_types'].tolist(), data['start_bytes'].tolist(), data['end_bytes'].tolist()))
+                offsets = data['token_offsets'].tolist()
+            return rules, offsets
+        except Exception:
+            return None
+
+    def _save_cached_parse(self, cache_path: Path, rules: List[Tuple[str, int, int]], offsets) -> None:
+        """Write rules and raw token offsets atomically so concurrent workers never see partial files.
+
+        A failed write only costs the cache entry: the temp file is removed and the
+        first failure is logged.
+        """
+        tmp_path = cache_path.with_name(f"{cache_path.stem}.{os.getpid()}.tmp")
+        try:
+            node_types = np.array([r[0] for r in rules], dtype=str)
+            start_bytes = np.fromiter((r[1] for r in rules), dtype=np.int64, count=len(rules))
+            end_bytes = np.fromiter((r[2] for r in rules), dtype=np.int64, count=len(rules))
+            token_offsets = np.asarray(offsets, dtype=np.int64).reshape(-1, 2)
+            with open(tmp_path, 'wb') as f:
+                np.savez(f, node_types=node_types, start_bytes=start_bytes, end_bytes=end_bytes, token_offsets=token_offsets)
+            os.replace(tmp_path, cache_path)
+        except Exception as e:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            if not self._cache_write_warned:
+                self._cache_write_warned = True
+                logger.warning("cannot write parse cache in %s (%s); continuing without caching", self.cache_dir, e)
     
-    def calculate_rule_level_alignment(self, code: str, language: str) -> Tuple[float, Dict]:
-        """Calculate rule-level alignment score"""
-        if language not in self.parsers:
+    def calculate_rule_level_alignment(self, code: str, language: str, offset_mapping: Optional[List[Tuple[int, int]]] = None) -> Tuple[float, Dict]:
+        """Calculate rule-level alignment score.
+
+        offset_mapping may carry character offsets from an earlier batched tokenizer
+        call on the same code; otherwise the code is tokenized here.
+        """
+        score, _, _, rule_details = self.calculate_alignment_counts(code, language, offset_mapping=offset_mapping, detailed=True, include_aligned=True)
+        return score, {_rule_key_str(rule): entry for rule, entry in rule_details.items()}
+
+    def calculate_rule_level_alignment_batch(self, codes: List[str], language: str) -> List[Tuple[float, Dict]]:
+        """Calculate rule-level alignment for several code strings, in order.
+
+        All codes are tokenized in one batched call (parallelised inside the Rust
+        tokenizer); each result matches calculate_rule_level_alignment.
+        """
+        if not codes:
+            return []
+        encodings = self.tokenizer(list(codes), add_special_tokens=False, return_offsets_mapping=True)
+        return [
+            self.calculate_rule_level_alignment(code, language, offset_mapping=offsets)
+            for code, offsets in zip(codes, encodings['offset_mapping'])
+        ]
+
+    def calculate_alignment_counts(self, code: str, language: str, offset_mapping: Optional[List[Tuple[int, int]]] = None, detailed: bool = False, code_bytes: Optional[Union[bytes, mmap.mmap]] = None, include_aligned: bool = False, compact_details: bool = False) -> Tuple[float, int, int, Optional[Dict]]:
+        """Calculate (score, aligned_count, total_count, rule_details).
+
+        Counts are over distinct (type, start_byte, end_byte) rules. The per-rule
+        dict is only built when detailed=True (otherwise rule_details is None) and
+        then holds just the unaligned rules, unless include_aligned=True adds a
+        {'fully_aligned': True} entry for every other rule. Keys are the
+        (type, start_byte, end_byte) rule tuples. compact_details=True makes the
+        values UnalignedRule records (no token context or explanations) and
+        ignores include_aligned. Pass code_bytes (bytes
+        or a read-only mmap) when the caller already holds the UTF-8 encoding of
+        code to skip re-encoding.
+        """
+        parser = self._thread_parser(language)
+        if parser is None:
             raise ValueError(f"Unsupported language: {language}")
+        if code_bytes is None:
+            code_bytes = code.encode('utf-8')
         
-        parser = self.parsers[language]
-        code_bytes = code.encode('utf-8')
+        cache_path = self._cache_path(code_bytes, language) if self.cache_dir else None
+        cached = self._load_cached_parse(cache_path) if cache_path is not None and cache_path.exists() else None
         
-        # Parse code
-        tree = parser.parse(code_bytes)
+        # Extract rules as (type, start_byte, end_byte) in pre-order, walking the tree
+        # with a cursor instead of recursing through node.children. Node kinds are
+        # matched by integer kind_id against the grammar's pre-filtered names.
+        kind_names = self._rule_kind_names(language)
+        def extract_rules(tree):
+            rules = []
+            cursor = tree.walk()
+            while True:
+                node = cursor.node
+                node_type = kind_names.get(node.kind_id)
+                if node_type is not None:
+                    rules.append((node_type, node.start_byte, node.end_byte))
+                if cursor.goto_first_child():
+                    continue
+                while not cursor.goto_next_sibling():
+                    if not cursor.goto_parent():
+                        return rules
         
-        # Extract rules
-        def extract_rules(node, rules=None):
+        encode_future = None
+        if cached is not None:
+            rules, offset_mapping = cached
+        else:
+            # Tokenize in the background while this thread parses and walks the tree
+            if offset_mapping is None:
+                encode_future = _encode_pool().submit(
+                    self.tokenizer, code,
+                    add_special_tokens=False,
+                    return_offsets_mapping=True
+                )
+            # Identical files (common in scraped corpora) reuse rules from an in-memory LRU
+            rules_key = (language, hashlib.blake2b(code_bytes, digest_size=16).digest())
+            with self._rules_cache_lock:
+                rules = self.rules_cache.get(rules_key)
+                if rules is not None:
+                    self.rules_cache.move_to_end(rules_key)
             if rules is None:
-                rules = []
-            
-            if node.type and not node.type.startswith('ERROR'):
-                rules.append({
-                    'type': node.type,
-                    'start_byte': node.start_byte,
-                    'end_byte': node.end_byte
-                })
-            
-            for child in node.children:
-                extract_rules(child, rules)
-            
-            return rules
-        
-        rules = extract_rules(tree.root_node)
+                # Parse code; the tree is dropped as soon as its rules are extracted so its
+                # node storage is not held through tokenization and alignment
+                try:
+                    tree = parser.parse(code_bytes)
+                except ValueError:
+                    # A timed-out parse would otherwise be resumed by the next call
+                    parser.reset()
+                    raise
+                rules = extract_rules(tree)
+                del tree
+                with self._rules_cache_lock:
+                    self.rules_cache[rules_key] = rules
+                    if len(self.rules_cache) > self.RULES_CACHE_SIZE:
+                        self.rules_cache.popitem(last=False)
         
+        # Build char->byte mapping once; used for token offsets and mid-word detection
+        char_to_byte = _char_to_byte_offsets(code, code_bytes)
+
         # Tokenization with reliable offsets (prefer fast tokenizer offset_mapping)
-        token_boundaries = []
+        token_array = None
         token_source = 'offset_mapping'
         try:
-            encoding = self.tokenizer(
-                code,
-                add_special_tokens=False,
-                return_offsets_mapping=True
-            )
-            offsets = encoding.get('offset_mapping')
+            if offset_mapping is not None:
+                offsets = offset_mapping
+            elif encode_future is not None:
+                offsets = encode_future.result().get('offset_mapping')
+            else:
+                encoding = self.tokenizer(
+                    code,
+                    add_special_tokens=False,
+                    return_offsets_mapping=True
+                )
+                offsets = encoding.get('offset_mapping')
             if offsets is None:
                 raise ValueError('offset_mapping not available')
-
-            # Build char->byte mapping once
-            char_to_byte = [0] * (len(code) + 1)
-            bpos = 0
-            for i, ch in enumerate(code):
-                blen = len(ch.encode('utf-8'))
-                char_to_byte[i] = bpos
-                bpos += blen
-            char_to_byte[len(code)] = len(code_bytes)
-
-            # Normalize and filter offsets; exclude zero-length pairs and specials
-            norm_offsets = []
-            for pair in offsets:
-                if pair is None:
-                    continue
-                if isinstance(pair, (list, tuple)) and len(pair) == 2:
-                    s, e = pair
-                else:
-                    continue
-                if s is None or e is None:
-                    continue
-                if e <= s:
-                    continue
-                s = max(0, min(s, len(code)))
-                e = max(0, min(e, len(code)))
-                norm_offsets.append((s, e))
-
-            token_boundaries = [(char_to_byte[s], char_to_byte[e]) for (s, e) in norm_offsets]
-
-            # Final guard: ensure we have tuples of two ints within range
-            token_boundaries = [
-                (int(max(0, min(sb, len(code_bytes)))), int(max(0, min(eb, len(code_bytes)))))
-                for (sb, eb) in token_boundaries
-                if isinstance(sb, int) and isinstance(eb, int) and eb > sb
-            ]
+            if cache_path is not None and cached is None:
+                self._save_cached_parse(cache_path, rules, offsets)
+
+            # Normalize and filter offsets in one array pass; exclude zero-length pairs and specials
+            offset_array = np.asarray(offsets, dtype=np.int64).reshape(-1, 2)
+            offset_array = np.clip(offset_array[offset_array[:, 1] > offset_array[:, 0]], 0, len(code))
+            token_array = char_to_byte[offset_array]
+            token_array = token_array[token_array[:, 1] > token_array[:, 0]]
         except Exception:
-            # Fallback: heuristic byte-search per token id (less reliable across tokenizers)
+            # Fallback: decode every token in one batched call and lay the pieces end to end
+            # (convert_ids_to_tokens yields vocabulary symbols such as 'Ġdef', not source text)
             try:
                 tokens = self.tokenizer.encode(code, add_special_tokens=False)
-                token_texts = [self.tokenizer.decode([token], clean_up_tokenization_spaces=False) for token in tokens]
+                token_texts = self.tokenizer.batch_decode([[token] for token in tokens], clean_up_tokenization_spaces=False)
             except Exception as e:
                 print(f"Tokenization error: {e}")
-                return 0.0, {}
-            token_source = 'heuristic_decode'
-
-        # Build token boundaries if we fell back or need to reconstruct
-        if 'token_boundaries' not in locals():
-            token_boundaries = []
-            current_pos = 0
-            for token_text in token_texts:
-                token_bytes = token_text.encode('utf-8')
-                if token_bytes.strip():
-                    token_start = -1
-                    for i in range(current_pos, len(code_bytes) - len(token_bytes) + 1):
-                        if code_bytes[i:i+len(token_bytes)] == token_bytes:
-                            token_start = i
-                            break
-                    if token_start != -1:
-                        token_end = token_start + len(token_bytes)
-                        token_boundaries.append((token_start, token_end))
-                        current_pos = token_end
-                    else:
-                        token_boundaries.append((current_pos, min(current_pos + 1, len(code_bytes))))
-                        current_pos = min(current_pos + 1, len(code_bytes))
-                else:
-                    token_boundaries.append((current_pos, min(current_pos + 1, len(code_bytes))))
-                    current_pos = min(current_pos + 1, len(code_bytes))
+                return 0.0, 0, 0, ({} if detailed else None)
+            token_source = 'decoded_lengths'
+            token_lengths = np.fromiter((len(text.encode('utf-8')) for text in token_texts), dtype=np.int64, count=len(token_texts))
+            token_ends = np.minimum(np.cumsum(token_lengths), len(code_bytes))
+            token_array = np.stack([token_ends - token_lengths, token_ends], axis=1).clip(0, len(code_bytes))
+            token_array = token_array[token_array[:, 1] > token_array[:, 0]]
         
         # Safety fallback: if still empty, degrade to single-byte boundaries to avoid crashes
-        if not token_boundaries:
+        if len(token_array) == 0:
             token_source = 'single_byte_fallback'
-            token_boundaries = [(i, i + 1) for i in range(len(code_bytes))]
+            byte_positions = np.arange(len(code_bytes), dtype=np.int64)
+            token_array = np.stack([byte_positions, byte_positions + 1], axis=1)
+
+        # Calculate alignment with boundary-crossing detection: mid-word flags for every
+        # rule come from one split mask over byte offsets (numba kernel when available)
+        rule_starts = np.fromiter((r[1] for r in rules), dtype=np.int64, count=len(rules))
+        rule_ends = np.fromiter((r[2] for r in rules), dtype=np.int64, count=len(rules))
+        split_mask = _word_split_mask(code, code_bytes, char_to_byte)
+        aligned_rules, mid_word_starts, mid_word_ends = _midword_flags(split_mask, rule_starts, rule_ends)
+        alignment_score = (aligned_rules / len(rules) * 100) if rules else 0
+        # Only rules with a mid-word boundary get per-rule work below; duplicate rules
+        # share a span and hence an alignment outcome
+        misaligned_idx = np.flatnonzero(mid_word_starts | mid_word_ends)
+        misaligned_ids = misaligned_idx.tolist()
+        total_count = len(set(rules))
+        aligned_count = total_count - len({rules[i] for i in misaligned_ids})
+        if not detailed:
+            return alignment_score, aligned_count, total_count, None
+        if compact_details:
+            return alignment_score, aligned_count, total_count, {
+                rules[i]: UnalignedRule(rules[i], not mid_word_starts[i], not mid_word_ends[i], _preview_slice(code_bytes, rules[i][1], rules[i][2]))
+                for i in misaligned_ids
+            }
 
-        # Optionally build byte->UTF16 code unit index mapping (for emoji safety / external consumers)
-        byte_to_utf16_index = None
-        if self.emit_utf16_offsets:
-            try:
-                # Build mapping of byte positions to UTF-16 code unit indices
-                byte_to_utf16_index = [0] * (len(code_bytes) + 1)
-                byte_pos = 0
-                utf16_index = 0
-                for ch in code:
-                    encoded = ch.encode('utf-8')
-                    blen = len(encoded)
-                    # surrogate pair in UTF-16 if codepoint > 0xFFFF
-                    units = 2 if ord(ch) > 0xFFFF else 1
-                    # Fill mapping for interior bytes of this codepoint
-                    for i in range(blen):
-                        byte_to_utf16_index[byte_pos + i] = utf16_index
-                    # Boundary after this codepoint
-                    byte_to_utf16_index[byte_pos + blen] = utf16_index + units
-                    byte_pos += blen
-                    utf16_index += units
-            except Exception:
-                byte_to_utf16_index = None
-        
-        # Calculate alignment with boundary-crossing detection
-        aligned_rules = 0
         rule_details = {}
-        
-        def _find_containing_token(pos):
-            for idx, (tb_start, tb_end) in enumerate(token_boundaries):
-                if tb_start < pos < tb_end:
-                    return idx, tb_start, tb_end
-            return None
 
-        # Build char->byte and byte->char boundary maps for mid-word detection (independent of tokenizer)
-        if 'char_to_byte' not in locals():
-            char_to_byte = [0] * (len(code) + 1)
-            bpos_tmp = 0
-            for i_tmp, ch_tmp in enumerate(code):
-                char_to_byte[i_tmp] = bpos_tmp
-                bpos_tmp += len(ch_tmp.encode('utf-8'))
-            char_to_byte[len(code)] = len(code_bytes)
-        byte_to_char = {char_to_byte[i]: i for i in range(len(char_to_byte))}
-
-        def _is_word_char(ch: str) -> bool:
-            return ch.isalnum() or ch == '_'
-
-        for rule in rules:
-            rule_start = rule['start_byte']
-            rule_end = rule['end_byte']
-            
-            # Mid-word boundary detection based on source text, per research definition
-            start_ci = byte_to_char.get(rule_start)
-            end_ci = byte_to_char.get(rule_end)
-
-            prev_ch_s = code[start_ci - 1] if start_ci is not None and start_ci > 0 else None
-            curr_ch_s = code[start_ci] if start_ci is not None and start_ci < len(code) else None
-            mid_word_start = bool(prev_ch_s and curr_ch_s and _is_word_char(prev_ch_s) and _is_word_char(curr_ch_s))
-
-            prev_ch_e = code[end_ci - 1] if end_ci is not None and end_ci > 0 else None
-            curr_ch_e = code[end_ci] if end_ci is not None and end_ci < len(code) else None
-            mid_word_end = bool(prev_ch_e and curr_ch_e and _is_word_char(prev_ch_e) and _is_word_char(curr_ch_e))
-
-            # Aligned if boundary does not split a word
-            start_aligned = not mid_word_start
-            end_aligned = not mid_word_end
-
-            # Crossing = only when a boundary splits a word
-            crossing_start = mid_word_start
-            crossing_end = mid_word_end
+        # Optionally map byte offsets to UTF-16 code unit indices (for emoji safety / external consumers)
+        byte_to_utf16_index = _byte_to_utf16_offsets(code_bytes, char_to_byte) if self.emit_utf16_offsets else None
+
+        if include_aligned:
+            for rule in rules:
+                details_entry = {'fully_aligned': True}
+                if byte_to_utf16_index is not None:
+                    details_entry['start_utf16'] = int(byte_to_utf16_index[rule[1]])
+                    details_entry['end_utf16'] = int(byte_to_utf16_index[rule[2]])
+                rule_details[rule] = details_entry
+
+        # Token ends are non-decreasing for real tokenizer output, so the first token ending
+        # past pos is the only candidate that can contain it (binary search instead of a scan)
+        token_starts = token_array[:, 0]
+        token_ends = token_array[:, 1]
+        crossing_starts = mid_word_starts[misaligned_idx].tolist()
+        crossing_ends = mid_word_ends[misaligned_idx].tolist()
+        boundary_starts = rule_starts[misaligned_idx]
+        boundary_ends = rule_ends[misaligned_idx]
+        ends_sorted = bool(np.all(token_ends[1:] >= token_ends[:-1]))
+
+        # Containing token for each misaligned rule boundary, resolved all at once
+        if ends_sorted:
+            start_tokens = _containing_token_indices(token_starts, token_ends, boundary_starts)
+            end_tokens = _containing_token_indices(token_starts, token_ends, boundary_ends)
+        else:
+            start_tokens = _first_containing_token_indices(token_starts, token_ends, boundary_starts, mid_word_starts[misaligned_idx])
+            end_tokens = _first_containing_token_indices(token_starts, token_ends, boundary_ends, mid_word_ends[misaligned_idx])
 
-            fully_aligned = not (mid_word_start or mid_word_end)
-            if fully_aligned:
-                aligned_rules += 1
-            
-            rule_key = f"{rule['type']}_{rule['start_byte']}_{rule['end_byte']}"
+        for i, crossing_start, crossing_end, s_idx, e_idx in zip(
+                misaligned_ids, crossing_starts, crossing_ends, start_tokens, end_tokens):
+            rule = rules[i]
+            rule_type, rule_start, rule_end = rule
 
-            # Only compute token context if boundary splits a word
+            # Token context and reasons only for boundaries that split a word
             crossing_start_reason = None
             token_start_context = None
             if crossing_start:
-                start_cross_info = _find_containing_token(rule_start)
-                if start_cross_info is not None:
-                    s_idx, s_tb, s_te = start_cross_info
-                    s_text = code_bytes[s_tb:s_te].decode('utf-8', errors='ignore')
+                if s_idx >= 0:
+                    s_tb, s_te = int(token_starts[s_idx]), int(token_ends[s_idx])
                     token_start_context = {
                         'token_index': s_idx,
                         'token_start': s_tb,
                         'token_end': s_te,
-                        'token_text_preview': s_text[:50]
+                        'token_text_preview': _text_preview(code_bytes, s_tb, s_te)
                     }
-                left = prev_ch_s if prev_ch_s is not None else ''
-                right = curr_ch_s if curr_ch_s is not None else ''
-                crossing_start_reason = f"rule.start_byte={rule_start} splits word between '{left}' and '{right}'"
+                start_ci = int(np.searchsorted(char_to_byte, rule_start))
+                crossing_start_reason = f"rule.start_byte={rule_start} splits word between '{code[start_ci - 1]}' and '{code[start_ci]}'"
 
             crossing_end_reason = None
             token_end_context = None
             if crossing_end:
-                end_cross_info = _find_containing_token(rule_end)
-                if end_cross_info is not None:
-                    e_idx, e_tb, e_te = end_cross_info
-                    e_text = code_bytes[e_tb:e_te].decode('utf-8', errors='ignore')
+                if e_idx >= 0:
+                    e_tb, e_te = int(token_starts[e_idx]), int(token_ends[e_idx])
                     token_end_context = {
                         'token_index': e_idx,
                         'token_start': e_tb,
                         'token_end': e_te,
-                        'token_text_preview': e_text[:50]
+                        'token_text_preview': _text_preview(code_bytes, e_tb, e_te)
                     }
-                left = prev_ch_e if prev_ch_e is not None else ''
-                right = curr_ch_e if curr_ch_e is not None else ''
-                crossing_end_reason = f"rule.end_byte={rule_end} splits word between '{left}' and '{right}'"
-
-            if fully_aligned:
-                details_entry = {
-                    'fully_aligned': True
-                }
-            else:
-                details_entry = {
-                    'type': rule['type'],
-                    'start_byte': rule['start_byte'],
-                    'end_byte': rule['end_byte'],
-                    'start_aligned': start_aligned,
-                    'end_aligned': end_aligned,
-                    'crossing_start': crossing_start,
-                    'crossing_end': crossing_end,
-                    'crossing_start_reason': crossing_start_reason,
-                    'crossing_end_reason': crossing_end_reason,
-                    'token_start_context': token_start_context,
-                    'token_end_context': token_end_context,
-                    'fully_aligned': False,
-                    'text_preview': code_bytes[rule_start:rule_end].decode('utf-8', errors='ignore')[:50],
-                    'explain_tree_sitter': f"Tree-sitter node '{rule['type']}' spans bytes [{rule_start}, {rule_end}) from node.start_byte/end_byte.",
-                    'explain_tokenizer': f"Token boundaries derived via {token_source}; offsets mapped to UTF-8 byte positions.",
-                }
+                end_ci = int(np.searchsorted(char_to_byte, rule_end))
+                crossing_end_reason = f"rule.end_byte={rule_end} splits word between '{code[end_ci - 1]}' and '{code[end_ci]}'"
+
+            details_entry = {
+                'type': rule_type,
+                'start_byte': rule_start,
+                'end_byte': rule_end,
+                'start_aligned': not crossing_start,
+                'end_aligned': not crossing_end,
+                'crossing_start': crossing_start,
+                'crossing_end': crossing_end,
+                'crossing_start_reason': crossing_start_reason,
+                'crossing_end_reason': crossing_end_reason,
+                'token_start_context': token_start_context,
+                'token_end_context': token_end_context,
+                'fully_aligned': False,
+                'text_preview': _text_preview(code_bytes, rule_start, rule_end),
+                'explain_tree_sitter': f"Tree-sitter node '{rule_type}' spans bytes [{rule_start}, {rule_end}) from node.start_byte/end_byte.",
+                'explain_tokenizer': f"Token boundaries derived via {token_source}; offsets mapped to UTF-8 byte positions.",
+            }
             if byte_to_utf16_index is not None:
-                sb = rule['start_byte']
-                eb = rule['end_byte']
-                if 0 <= sb < len(byte_to_utf16_index):
-                    details_entry['start_utf16'] = byte_to_utf16_index[sb]
-                if 0 <= eb <= len(byte_to_utf16_index):
-                    details_entry['end_utf16'] = byte_to_utf16_index[eb]
-            rule_details[rule_key] = details_entry
-        
-        alignment_score = (aligned_rules / len(rules) * 100) if rules else 0
-        return alignment_score, rule_details
+                details_entry['start_utf16'] = int(byte_to_utf16_index[rule_start])
+                details_entry['end_utf16'] = int(byte_to_utf16_index[rule_end])
+            rule_details[rule] = details_entry
+
+        return alignment_score, aligned_count, total_count, rule_details
     
-    def _analyze_single_file(self, args_tuple):
-        """Deprecated: replaced by top-level worker function for pickling safety."""
-        return _worker_analyze_file(args_tuple)
+    def _iter_parallel_file_results(self, code_files: List[str], language: str, workers: int, per_file_timeout: int, detailed: bool = True, timing: bool = True, use_processes: bool = False):
+        """Yield per-file results from a thread or process pool in file order.
+
+        workers == AUTO_WORKERS picks one worker per 128 files, capped at the CPU count. Runs
+        below THREAD_POOL_MAX_FILES use threads in this process (tree-sitter parsing
+        and the Rust tokenizer release the GIL), avoiding pickling and a second
+        tokenizer load. Larger runs, or any run with use_processes, use a process pool
+        where each worker builds its own analyzer once in _worker_init. On threads
+        per_file_timeout only bounds tree-sitter parsing; the process pool bounds each
+        file's whole analysis with SIGALRM.
+        """
+        if workers > 1:
+            max_workers = workers
+        else:
+            max_workers = max(1, min(os.cpu_count() or 1, math.ceil(len(code_files) / 128)))
+        # Aim for ~8 groups per worker so stragglers balance out; each group is one
+        # batched tokenizer call inside the worker, capped at 64 files
+        group_size = max(1, min(64, len(code_files) // (8 * max_workers)))
+        groups = [code_files[i:i + group_size] for i in range(0, len(code_files), group_size)]
+        if not use_processes and len(code_files) < self.THREAD_POOL_MAX_FILES:
+            yield from self._iter_threaded_group_results(groups, language, max_workers, per_file_timeout, detailed, timing)
+            return
+        # pass timeout to workers via env (inherited when the pool spawns them)
+        os.environ['ANALYZER_PER_FILE_TIMEOUT'] = str(max(1, int(per_file_timeout)))
+        mp_ctx = multiprocessing.get_context('spawn')
+        with mp_ctx.Pool(
+            max_workers,
+            initializer=_worker_init,
+            initargs=(self.model_name, self.emit_utf16_offsets, language, self.cache_dir, self.named_rules_only)
+        ) as pool:
+            # Keep submission order so reports and flushed parts cover a prefix of code_files
+            # (--start_index resumes from there); groups are already the unit of work
+            progress = tqdm(total=len(code_files), desc=f"Analyzing {language}", unit="files")
+            # Each task also hints the group that will start on its slot after it
+            tasks = ((group, language, detailed, timing, groups[i + max_workers] if i + max_workers < len(groups) else None) for i, group in enumerate(groups))
+            for attempted, results in pool.imap(_worker_analyze_group, tasks, chunksize=1):
+                for result in results:
+                    yield _unpack_file_result(result)
+                progress.update(attempted)
+            progress.close()
+
+    def _iter_threaded_group_results(self, groups: List[List[str]], language: str, max_workers: int, per_file_timeout: int, detailed: bool = True, timing: bool = True):
+        """Yield per-file results from groups analysed on a thread pool in this process.
+
+        SIGALRM only reaches the main thread, so the per-file timeout is applied as a
+        tree-sitter parse timeout on each thread's parser instead; tokenization and
+        alignment are not time-limited on this path.
+        """
+        self._thread_parse_timeout_micros = max(1, int(per_file_timeout)) * 1_000_000
+        progress = tqdm(total=sum(len(group) for group in groups), desc=f"Analyzing {language}", unit="files")
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='analyze') as executor:
+            futures = [
+                executor.submit(
+                    self._analyze_file_group, group, language, detailed=detailed, timing=timing, max_code_bytes=MAX_CODE_BYTES,
+                    prefetch_paths=groups[i + max_workers] if i + max_workers < len(groups) else None
+                )
+                for i, group in enumerate(groups)
+            ]
+            # Collect in submission order, like the process pool
+            for group, future in zip(groups, futures):
+                yield from future.result()
+                progress.update(len(group))
+        progress.close()
+
+    def _analyze_file_group(self, file_paths: List[str], language: str, detailed: bool = True, timing: bool = True, file_timeout: int = 0, max_code_bytes: Optional[int] = None, prefetch_paths: Optional[List[str]] = None, mark_perfect: bool = True) -> List[Dict[str, Any]]:
+        """Read, batch-tokenize and align a group of files; returns results for the files that succeed.
+
+        prefetch_paths (the next group to run) get a readahead hint once this
+        group's files are read, so their disk reads overlap this group's work.
+        Tokenization and alignment are done by _iter_batch_alignment.
+        """
+        group = []
+        for file_path in file_paths:
+            try:
+                code, code_bytes = _read_code_file(file_path, max_bytes=max_code_bytes)
+            except Exception:
+                continue
+            # isspace() tests in place; strip() would copy the whole file
+            if code and not code.isspace():
+                group.append((file_path, code, code_bytes))
+        if prefetch_paths:
+            _prefetch_files(prefetch_paths)
+
+        return [
+            _build_file_result(file_path, score, aligned_count, total_count, details, len(code), analysis_time, mark_perfect=mark_perfect)
+            for file_path, code, (score, aligned_count, total_count, details), analysis_time
+            in self._iter_batch_alignment(group, language, detailed=detailed, timing=timing, file_timeout=file_timeout)
+        ]
+
+    def _iter_batch_alignment(self, group: List[Tuple[Any, str, Optional[Union[bytes, mmap.mmap]]]], language: str, detailed: bool = True, timing: bool = True, file_timeout: int = 0, compact_details: bool = False):
+        """Align (key, code, code_bytes) items that share one batched tokenizer call.
+
+        Yields (key, code, calculate_alignment_counts result, analysis_time) for
+        the items that succeed; code_bytes may be None. A fast tokenizer encodes
+        a list of strings in one call (parallelised inside Rust) and each item's
+        offsets are handed to calculate_alignment_counts. file_timeout > 0 arms the
+        (already installed) SIGALRM timer per item, and for len(group) items'
+        worth around the encode.
+
+        Items are all aligned before the first is yielded, so between items the
+        timer is only re-armed (one setitimer call per item) and each item's time
+        comes from a single clock read.
+        """
+        # Batched encode; on failure each item falls back to its own tokenizer call
+        offset_mappings = [None] * len(group)
+        encode_time = 0.0
+        if group:
+            encode_start_ns = time.perf_counter_ns()
+            if file_timeout:
+                signal.setitimer(signal.ITIMER_REAL, file_timeout * len(group))
+            try:
+                encodings = self.tokenizer(
+                    [code for _, code, _ in group],
+                    add_special_tokens=False,
+                    return_offsets_mapping=True
+                )
+                offset_mappings = encodings['offset_mapping']
+            except Exception:
+                pass
+            finally:
+                if file_timeout:
+                    signal.setitimer(signal.ITIMER_REAL, 0)
+            encode_time = (time.perf_counter_ns() - encode_start_ns) / 1e9
+        group_size = sum(len(code) for _, code, _ in group) or 1
+
+        aligned = []
+        # Each item's time runs from the previous clock read, which ends the previous item
+        last_ns = time.perf_counter_ns() if timing else 0
+        try:
+            for (key, code, code_bytes), offsets in zip(group, offset_mappings):
+                try:
+                    if file_timeout:
+                        signal.setitimer(signal.ITIMER_REAL, file_timeout)
+                    counts = self.calculate_alignment_counts(code, language, offset_mapping=offsets, detailed=detailed, code_bytes=code_bytes, compact_details=compact_details)
+                    analysis_time = None
+                    if timing:
+                        now_ns = time.perf_counter_ns()
+                        # Charge each item its size-proportional share of the batched encode
+                        analysis_time = (now_ns - last_ns) / 1e9 + encode_time * len(code) / group_size
+                        last_ns = now_ns
+                    aligned.append((key, code, counts, analysis_time))
+                except Exception:
+                    if timing:
+                        last_ns = time.perf_counter_ns()
+        finally:
+            if file_timeout:
+                signal.setitimer(signal.ITIMER_REAL, 0)
+        yield from aligned
+
+    def _analyze_sample_batch(self, samples: List[Tuple[Any, str, None]], language: str, file_timeout: int = 0) -> List[Tuple]:
+        """Align a batch of dataset samples; returns (sample_id, code_size, score, aligned, total, unaligned rules, time) per sample.
+
+        With dedup_cache_size set, samples whose content was seen before reuse the cached
+        result and skip tokenization and parsing; their analysis time is reported as 0.
+        """
+        if not self.dedup_cache_size:
+            results = []
+            for sample_id, code, counts, sample_time in self._iter_batch_alignment(samples, language, detailed=True, file_timeout=file_timeout, compact_details=True):
+                results.append((sample_id, len(code)) + self._sample_counts(counts) + (sample_time,))
+            return results
+
+        cache = self.alignment_cache
+        keys = [(language, hashlib.blake2b(code.encode('utf-8', 'surrogatepass'), digest_size=16).digest()) for _, code, _ in samples]
+        # Cached results are taken up front so evictions below cannot drop them;
+        # each distinct uncached content is analyzed once, keyed by its digest
+        known = {}
+        todo = {}
+        for (_, code, _), key in zip(samples, keys):
+            if key in known or key in todo:
+                continue
+            entry = cache.get(key)
+            if entry is not None:
+                cache.move_to_end(key)
+                known[key] = entry
+            else:
+                todo[key] = (key, code, None)
+        analyzed = {}
+        for key, code, counts, sample_time in self._iter_batch_alignment(list(todo.values()), language, detailed=True, file_timeout=file_timeout, compact_details=True):
+            analyzed[key] = (self._sample_counts(counts), sample_time)
+
+        results = []
+        for (sample_id, code, _), key in zip(samples, keys):
+            fresh = analyzed.pop(key, None)
+            if fresh is not None:
+                entry, sample_time = fresh
+                known[key] = cache[key] = entry
+                if len(cache) > self.dedup_cache_size:
+                    cache.popitem(last=False)
+            else:
+                entry = known.get(key)
+                if entry is None:
+                    # Timed out or failed
+                    continue
+                sample_time = 0.0
+            results.append((sample_id, len(code)) + entry + (sample_time,))
+        return results
 
-    def analyze_language_files(self, code_dir: str, language: str, flush_every: int = 0, output_dir: str = "results/multilang", workers: int = 1, per_file_timeout: int = 10, max_files: Optional[int] = None, batch_size: int = 0, start_index: int = 0) -> Dict:
+    @staticmethod
+    def _sample_counts(counts: Tuple) -> Tuple:
+        """(score, aligned, total, unaligned rules) for a dataset sample from calculate_alignment_counts output."""
+        score, aligned_count, total_count, details = counts
+        # Only keep unaligned rules for dataset path as well; they are expanded to dicts at write time
+        return score, aligned_count, total_count, list(details.values())
+
+    def _iter_serial_file_results(self, code_files: List[str], language: str, encode_batch_files: int = 64, detailed: bool = True, timing: bool = True, mark_perfect: bool = True):
+        """Yield per-file results in-process, tokenizing encode_batch_files files per call."""
+        progress = tqdm(total=len(code_files), desc=f"Analyzing {language}", unit="files")
+        for start in range(0, len(code_files), encode_batch_files):
+            batch = code_files[start:start + encode_batch_files]
+            next_batch = code_files[start + encode_batch_files:start + 2 * encode_batch_files]
+            yield from self._analyze_file_group(batch, language, detailed=detailed, timing=timing, prefetch_paths=next_batch, mark_perfect=mark_perfect)
+            progress.update(len(batch))
+        progress.close()
+
+    def analyze_language_files(self, code_dir: str, language: str, flush_every: int = 0, output_dir: str = "results/multilang", workers: int = 1, per_file_timeout: int = 10, max_files: Optional[int] = None, batch_size: int = 0, start_index: int = 0, stream_jsonl: bool = False, rule_details: bool = True, file_timing: bool = True, use_processes: bool = False) -> Dict:
         """Analyze all files for a specific language.
 
         Supports two layouts:
@@ -481,8 +1233,17 @@ class QuickMultiLanguageAnalyzer:
         2) A flat or nested directory tree at code_dir where we recursively
            collect files by extension for the specified language.
         Also supports passing a single file path in code_dir.
+
+        stream_jsonl: append every file's full record to
+           file_results_<model>_<language>.jsonl as it completes (followed by a
+           final '__summary__' record) and keep only the summary fields in memory; with batch_size, the returned 'files'
+           list stays empty (each part's report already holds its records).
+        rule_details: include the per-rule 'unaligned_rules' list in file records.
+        file_timing: time each file and record 'analysis_time'/'processing_speed'.
+        use_processes: with workers, always use the process pool, even for runs that
+           would otherwise use threads (see _iter_parallel_file_results).
         """
-        if language not in self.parsers:
+        if self._get_parser(language) is None:
             print(f"Skipping unsupported language: {language}")
             return {}
         
@@ -493,24 +1254,26 @@ class QuickMultiLanguageAnalyzer:
 
         # If a single file path is passed, check and use it directly
         if base_path.is_file():
-            if any(str(base_path).endswith(ext) for ext in extensions):
-                code_files = [base_path]
+            if str(base_path).endswith(tuple(extensions)):
+                code_files = [str(base_path)]
             else:
                 print(f"Provided file does not match {language} extensions: {base_path}")
                 return {}
         else:
-            # Prefer legacy layout if present: code_dir/<language>
-            language_dir = base_path / language
-            search_root = language_dir if language_dir.exists() else base_path
-
-            # Recursively gather files by extension from preferred root
-            for ext in extensions:
-                code_files.extend(search_root.rglob(f"*{ext}"))
-
-            # Fallback: if language_dir exists but yielded no files, also scan base_path recursively
-            if not code_files and language_dir.exists():
-                for ext in extensions:
-                    code_files.extend(base_path.rglob(f"*{ext}"))
+            files_key = (os.fspath(base_path), language)
+            code_files = _CODE_FILES_CACHE.get(files_key)
+            if code_files is None:
+                # Prefer legacy layout if present: code_dir/<language>
+                language_dir = base_path / language
+                search_root = language_dir if language_dir.exists() else base_path
+
+                # Recursively gather files by extension from preferred root
+                code_files = _find_code_files(search_root, extensions)
+
+                # Fallback: if language_dir exists but yielded no files, also scan base_path recursively
+                if not code_files and language_dir.exists():
+                    code_files = _find_code_files(base_path, extensions)
+                _CODE_FILES_CACHE[files_key] = code_files
         
         if not code_files:
             print(f"No {language} files found under {base_path}")
@@ -530,6 +1293,22 @@ class QuickMultiLanguageAnalyzer:
         
         print(f"\nAnalyzing {language.upper()} ({len(code_files)} files)")
         print("-" * 50)
+
+        jsonl_file = None
+        if stream_jsonl:
+            jsonl_path = Path(output_dir) / f"file_results_{self.model_name}_{language}.jsonl"
+            jsonl_path.parent.mkdir(parents=True, exist_ok=True)
+            # Append when resuming so earlier runs' records are kept
+            jsonl_file = open(jsonl_path, 'ab' if start_index else 'wb', buffering=JSONL_BUFFER_BYTES)
+            print(f"Streaming per-file results to: {jsonl_path}")
+
+        def record_file_result(res):
+            """Apply output options to one file result; returns the copy kept in memory."""
+            if jsonl_file is not None:
+                jsonl_file.write(_json_line(res))
+                # Full record is on disk; keep only the summary fields in memory
+                res = {k: v for k, v in res.items() if k != 'unaligned_rules'}
+            return res
         
         # If batch_size specified (>0), process in fixed-size batches (saving after each batch)
         if batch_size and batch_size > 0:
@@ -545,8 +1324,11 @@ class QuickMultiLanguageAnalyzer:
                 'avg_processing_speed': 0.0,
                 'files': []
             }
-            overall_start = time.time()
+            overall_start = time.perf_counter()
             part_idx = 0
+            # Running sums for avg_score, so streamed runs need not keep every record
+            score_sum = 0.0
+            scored_files = 0
 
             for start in range(0, len(code_files), batch_size):
                 batch = code_files[start:start+batch_size]
@@ -558,13 +1340,15 @@ class QuickMultiLanguageAnalyzer:
                 total_aligned = 0
                 total_code_size = 0
                 total_files = 0
-                batch_start_time = time.time()
+                batch_score_sum = 0.0
+                batch_start_time = time.perf_counter()
 
                 def process_collected_batch(batch_results):
-                    nonlocal file_results, total_rules, total_aligned, total_code_size, total_files
+                    nonlocal file_results, total_rules, total_aligned, total_code_size, total_files, batch_score_sum
                     for res in batch_results:
                         if not res:
                             continue
+                        res = record_file_result(res)
                         # Always include in totals
                         total_rules += res['total_rules']
                         total_aligned += res['aligned_rules']
@@ -573,80 +1357,16 @@ class QuickMultiLanguageAnalyzer:
                         # Include in report list only if not perfect
                         if not res.get('is_perfect', False):
                             file_results.append(res)
+                            batch_score_sum += res['score']
 
-                if workers and workers > 1:
-                    max_workers = workers if workers > 0 else (multiprocessing.cpu_count() or 1)
-                    mp_ctx = multiprocessing.get_context('spawn')
-                    with concurrent.futures.ProcessPoolExecutor(
-                        max_workers=max_workers,
-                        mp_context=mp_ctx,
-                        initializer=_worker_init,
-                        initargs=(self.model_name, self.emit_utf16_offsets, language)
-                    ) as ex:
-                        os.environ['ANALYZER_PER_FILE_TIMEOUT'] = str(max(1, int(per_file_timeout)))
-                        batch_iter = ex.map(_worker_analyze_file, ((str(p), language) for p in batch), chunksize=64)
-                        buf = []
-                        for res in tqdm(batch_iter, desc=f"Analyzing {language}", unit="files"):
-                            buf.append(res)
-                            if len(buf) >= 256:
-                                process_collected_batch(buf)
-                                buf = []
-                        if buf:
-                            process_collected_batch(buf)
+                if _use_worker_pool(workers):
+                    process_collected_batch(self._iter_parallel_file_results(batch, language, workers, per_file_timeout, detailed=rule_details, timing=file_timing, use_processes=use_processes))
                 else:
-                    results_local = []
-                    for file_path in tqdm(batch, desc=f"Analyzing {language}", unit="files"):
-                        # serial process single file
-                        try:
-                            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                                code = f.read()
-                            if not code.strip():
-                                continue
-                            code_size = len(code)
-                            file_start_time = time.time()
-                            score, details = self.calculate_rule_level_alignment(code, language)
-                            file_analysis_time = time.time() - file_start_time
-                            aligned_count = sum(1 for d in details.values() if d['fully_aligned'])
-                            unaligned_rules_list = [
-                                {
-                                    'rule_key': rk,
-                                    'type': rd.get('type'),
-                                    'start_byte': rd.get('start_byte'),
-                                    'end_byte': rd.get('end_byte'),
-                                    'start_aligned': rd.get('start_aligned'),
-                                    'end_aligned': rd.get('end_aligned'),
-                                    'crossing_start': rd.get('crossing_start'),
-                                    'crossing_end': rd.get('crossing_end'),
-                                    'crossing_start_reason': rd.get('crossing_start_reason'),
-                                    'crossing_end_reason': rd.get('crossing_end_reason'),
-                                    'token_start_context': rd.get('token_start_context'),
-                                    'token_end_context': rd.get('token_end_context'),
-                                    'explain_tree_sitter': rd.get('explain_tree_sitter'),
-                                    'explain_tokenizer': rd.get('explain_tokenizer'),
-                                    'fully_aligned': rd.get('fully_aligned'),
-                                    'text_preview': rd.get('text_preview')
-                                }
-                                for rk, rd in details.items() if not rd.get('fully_aligned')
-                            ]
-                            results_local.append({
-                                'file': file_path.name,
-                                'path': str(file_path),
-                                'score': score,
-                                'total_rules': len(details),
-                                'aligned_rules': aligned_count,
-                                'unaligned_rules': unaligned_rules_list,
-                                'code_size': code_size,
-                                'analysis_time': file_analysis_time,
-                                'processing_speed': code_size / file_analysis_time if file_analysis_time > 0 else 0,
-                                'is_perfect': len(unaligned_rules_list) == 0
-                            })
-                        except Exception:
-                            pass
-                    process_collected_batch(results_local)
+                    process_collected_batch(self._iter_serial_file_results(batch, language, detailed=rule_details, timing=file_timing))
 
                 # finalize batch stats and save
-                batch_time = time.time() - batch_start_time
-                avg_score = (sum(r['score'] for r in file_results) / len(file_results)) if file_results else 0.0
+                batch_time = time.perf_counter() - batch_start_time
+                avg_score = (batch_score_sum / len(file_results)) if file_results else 0.0
                 overall_alignment = (total_aligned / total_rules * 100) if total_rules > 0 else 0
                 avg_speed = total_code_size / batch_time if batch_time > 0 else 0
 
@@ -662,7 +1382,7 @@ class QuickMultiLanguageAnalyzer:
                     'avg_processing_speed': avg_speed,
                     'files': file_results
                 }
-                self._save_results({language: language_chunk_result}, [], output_dir, batch_time, suffix=f"_{language}_part_{part_idx}")
+                self._save_results({language: language_chunk_result}, [], output_dir, batch_time, suffix=f"_{language}_part_{part_idx}", quiet=self.QUIET_CHUNKS, compact=True)
 
                 # accumulate into overall totals
                 total_results['file_count'] += language_chunk_result['file_count']
@@ -670,7 +1390,11 @@ class QuickMultiLanguageAnalyzer:
                 total_results['total_aligned'] += language_chunk_result['total_aligned']
                 total_results['total_code_size'] += language_chunk_result['total_code_size']
                 total_results['total_analysis_time'] += language_chunk_result['total_analysis_time']
-                total_results['files'].extend(file_results)
+                score_sum += batch_score_sum
+                scored_files += len(file_results)
+                # Streamed records are already on disk and in this part's report
+                if jsonl_file is None:
+                    total_results['files'].extend(file_results)
 
                 # stop early if reached limited max_files
                 if max_files is not None and total_results['file_count'] >= max_files:
@@ -678,9 +1402,11 @@ class QuickMultiLanguageAnalyzer:
 
             # finalize overall aggregates
             if total_results['file_count'] > 0:
-                total_results['avg_score'] = (sum(r['score'] for r in total_results['files']) / len(total_results['files'])) if total_results['files'] else 0.0
+                total_results['avg_score'] = score_sum / scored_files if scored_files else 0.0
                 total_results['overall_alignment'] = (total_results['total_aligned'] / total_results['total_rules'] * 100) if total_results['total_rules'] > 0 else 0.0
                 total_results['avg_processing_speed'] = total_results['total_code_size'] / total_results['total_analysis_time'] if total_results['total_analysis_time'] > 0 else 0.0
+            if jsonl_file is not None:
+                _finish_jsonl(jsonl_file, total_results)
             return total_results
 
         # Analyze files (single run, with optional flush_every)
@@ -689,17 +1415,22 @@ class QuickMultiLanguageAnalyzer:
         total_aligned = 0
         total_code_size = 0
         total_files = 0
-        start_time = time.time()
+        start_time = time.perf_counter()
         chunk_idx = 0
         files_since_flush = 0
-        chunk_start_time = time.time()
+        chunk_start_time = time.perf_counter()
+        # Running totals over file_results (the unflushed, non-perfect records)
+        chunk_total_rules = chunk_total_aligned = chunk_total_size = 0
+        chunk_score_sum = 0.0
         
         # Parallel or serial processing of files
         def process_collected(batch_results):
             nonlocal file_results, total_rules, total_aligned, total_code_size, files_since_flush, chunk_idx, chunk_start_time, total_files
+            nonlocal chunk_total_rules, chunk_total_aligned, chunk_total_size, chunk_score_sum
             for res in batch_results:
                 if not res:
                     continue
+                res = record_file_result(res)
                 # Always include in totals and counts
                 total_rules += res['total_rules']
                 total_aligned += res['aligned_rules']
@@ -709,13 +1440,14 @@ class QuickMultiLanguageAnalyzer:
                 # Include in report list only if not perfect
                 if not res.get('is_perfect', False):
                     file_results.append(res)
+                    chunk_total_rules += res['total_rules']
+                    chunk_total_aligned += res['aligned_rules']
+                    chunk_total_size += res['code_size']
+                    chunk_score_sum += res['score']
                 if flush_every and files_since_flush >= flush_every:
                     chunk_idx += 1
-                    chunk_total_rules = sum(r['total_rules'] for r in file_results)
-                    chunk_total_aligned = sum(r['aligned_rules'] for r in file_results)
-                    chunk_total_size = sum(r['code_size'] for r in file_results)
-                    chunk_total_time = time.time() - chunk_start_time
-                    chunk_avg_score = sum(r['score'] for r in file_results) / len(file_results)
+                    chunk_total_time = time.perf_counter() - chunk_start_time
+                    chunk_avg_score = (chunk_score_sum / len(file_results)) if file_results else 0.0
                     chunk_avg_speed = chunk_total_size / chunk_total_time if chunk_total_time > 0 else 0
                     language_chunk_result = {
                         'language': language,
@@ -729,102 +1461,27 @@ class QuickMultiLanguageAnalyzer:
                         'avg_processing_speed': chunk_avg_speed,
                         'files': file_results
                     }
-                    self._save_results({language: language_chunk_result}, [], output_dir, chunk_total_time, suffix=f"_{language}_part_{chunk_idx}")
+                    self._save_results({language: language_chunk_result}, [], output_dir, chunk_total_time, suffix=f"_{language}_part_{chunk_idx}", quiet=self.QUIET_CHUNKS, compact=True)
                     file_results = []
                     files_since_flush = 0
-                    chunk_start_time = time.time()
+                    chunk_start_time = time.perf_counter()
+                    chunk_total_rules = chunk_total_aligned = chunk_total_size = 0
+                    chunk_score_sum = 0.0
 
-        if workers and workers > 1:
-            max_workers = workers if workers > 0 else (multiprocessing.cpu_count() or 1)
-            mp_ctx = multiprocessing.get_context('spawn')
-            with concurrent.futures.ProcessPoolExecutor(
-                max_workers=max_workers,
-                mp_context=mp_ctx,
-                initializer=_worker_init,
-                initargs=(self.model_name, self.emit_utf16_offsets, language)
-            ) as ex:
-                # pass timeout to workers via env
-                os.environ['ANALYZER_PER_FILE_TIMEOUT'] = str(max(1, int(per_file_timeout)))
-                # map returns in order; use chunksize for throughput
-                batch_iter = ex.map(_worker_analyze_file, ((str(p), language) for p in code_files), chunksize=64)
-                # consume in minibatches for reduced overhead
-                buf = []
-                for res in tqdm(batch_iter, desc=f"Analyzing {language}", unit="files"):
-                    buf.append(res)
-                    if len(buf) >= 256:
-                        process_collected(buf)
-                        buf = []
-                if buf:
-                    process_collected(buf)
+        # Results are consumed as they arrive; there is no per-item Future to amortize
+        if _use_worker_pool(workers):
+            process_collected(self._iter_parallel_file_results(code_files, language, workers, per_file_timeout, detailed=rule_details, timing=file_timing, use_processes=use_processes))
         else:
-            results = []
-            for file_path in tqdm(code_files, desc=f"Analyzing {language}", unit="files"):
-                # serial path: best-effort timeout using monotonic time check
-                start_t = time.time()
-                try:
-                    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                        code = f.read()
-                    if not code.strip():
-                        continue
-                    code_size = len(code)
-                    file_start_time = time.time()
-                    score, details = self.calculate_rule_level_alignment(code, language)
-                    file_analysis_time = time.time() - file_start_time
-                    aligned_count = sum(1 for d in details.values() if d['fully_aligned'])
-                    unaligned_rules_list = [
-                        {
-                            'rule_key': rk,
-                            'type': rd.get('type'),
-                            'start_byte': rd.get('start_byte'),
-                            'end_byte': rd.get('end_byte'),
-                            'start_aligned': rd.get('start_aligned'),
-                            'end_aligned': rd.get('end_aligned'),
-                            'crossing_start': rd.get('crossing_start'),
-                            'crossing_end': rd.get('crossing_end'),
-                            'crossing_start_reason': rd.get('crossing_start_reason'),
-                            'crossing_end_reason': rd.get('crossing_end_reason'),
-                            'token_start_context': rd.get('token_start_context'),
-                            'token_end_context': rd.get('token_end_context'),
-                            'explain_tree_sitter': rd.get('explain_tree_sitter'),
-                            'explain_tokenizer': rd.get('explain_tokenizer'),
-                            'fully_aligned': rd.get('fully_aligned'),
-                            'text_preview': rd.get('text_preview')
-                        }
-                        for rk, rd in details.items() if not rd.get('fully_aligned')
-                    ]
-                    results.append({
-                        'file': file_path.name,
-                        'path': str(file_path),
-                        'score': score,
-                        'total_rules': len(details),
-                        'aligned_rules': aligned_count,
-                        'unaligned_rules': unaligned_rules_list,
-                        'code_size': code_size,
-                        'analysis_time': file_analysis_time,
-                        'processing_speed': code_size / file_analysis_time if file_analysis_time > 0 else 0
-                    })
-                except Exception:
-                    pass
-                finally:
-                    if time.time() - start_t > per_file_timeout:
-                        # skip this file if took too long
-                        continue
-                if len(results) >= 256:
-                    process_collected(results)
-                    results = []
-            if results:
-                process_collected(results)
+            # The single-run serial path has always reported perfectly aligned files too
+            process_collected(self._iter_serial_file_results(code_files, language, detailed=rule_details, timing=file_timing, mark_perfect=False))
         
         # Calculate total analysis time and speed
-        total_time = time.time() - start_time
+        total_time = time.perf_counter() - start_time
         avg_speed = total_code_size / total_time if total_time > 0 else 0
         
-        if not file_results:
-            return {}
-        
         # If there are remaining unflushed files, they will be included in final stats and report
         # Calculate statistics
-        avg_score = (sum(r['score'] for r in file_results) / len(file_results)) if file_results else 0.0
+        avg_score = (chunk_score_sum / len(file_results)) if file_results else 0.0
         overall_alignment = (total_aligned / total_rules * 100) if total_rules > 0 else 0
         
         result = {
@@ -839,25 +1496,19 @@ class QuickMultiLanguageAnalyzer:
             'avg_processing_speed': avg_speed,
             'files': file_results
         }
+        if jsonl_file is not None:
+            _finish_jsonl(jsonl_file, result)
+        
+        if not file_results:
+            return {}
         
-        print(f"\n{language.upper()} Analysis Summary:")
-        print(f"  File count: {result['file_count']}")
-        print(f"  Average score: {result['avg_score']:.2f}%")
-        print(f"  Total rules: {result['total_rules']}")
-        print(f"  Total aligned: {result['total_aligned']}")
-        print(f"  Overall alignment rate: {result['overall_alignment']:.2f}%")
-        print(f"  Total code size: {result['total_code_size']/1024:.2f} KB")
-        print(f"  Total analysis time: {result['total_analysis_time']:.2f} seconds")
-        print(f"  Average processing speed: {result['avg_processing_speed']/1024:.2f} KB/sec")
+        sys.stdout.write(_language_summary_text(language.upper(), result))
         
         # If any remaining unflushed files and flush_every was set, save a final chunk for remainder
         if flush_every and file_results:
             chunk_idx += 1
-            chunk_total_rules = sum(r['total_rules'] for r in file_results)
-            chunk_total_aligned = sum(r['aligned_rules'] for r in file_results)
-            chunk_total_size = sum(r['code_size'] for r in file_results)
-            chunk_total_time = time.time() - chunk_start_time
-            chunk_avg_score = sum(r['score'] for r in file_results) / len(file_results)
+            chunk_total_time = time.perf_counter() - chunk_start_time
+            chunk_avg_score = chunk_score_sum / len(file_results)
             chunk_avg_speed = chunk_total_size / chunk_total_time if chunk_total_time > 0 else 0
 
             language_chunk_result = {
@@ -873,7 +1524,7 @@ class QuickMultiLanguageAnalyzer:
                 'files': file_results
             }
 
-            self._save_results({language: language_chunk_result}, [], output_dir, chunk_total_time, suffix=f"_{language}_part_{chunk_idx}")
+            self._save_results({language: language_chunk_result}, [], output_dir, chunk_total_time, suffix=f"_{language}_part_{chunk_idx}", quiet=self.QUIET_CHUNKS, compact=True)
         
         return result
 
@@ -889,13 +1540,28 @@ class QuickMultiLanguageAnalyzer:
         streaming: bool = True,
         use_auth_token: Optional[str] = None,
         output_dir: str = "results/multilang",
-        flush_every: int = 0
+        flush_every: int = 0,
+        encode_batch_size: int = 1000,
+        workers: int = 1,
+        per_file_timeout: int = 10,
+        stream_jsonl: bool = False,
+        min_code_size: int = 16,
+        max_code_size: int = 2_000_000
     ) -> Dict:
         """Analyze code samples from a HuggingFace dataset.
 
         - If fixed_language is provided, all samples will be analyzed with that language.
         - If language_field is provided, each example can specify its language; unsupported ones are skipped.
         - Results are aggregated per language and saved using the same reporting format.
+        - Samples are tokenized encode_batch_size at a time per language, with one tokenizer call per batch.
+        - workers > 1 analyses those batches on a process pool (AUTO_WORKERS uses one per CPU);
+          unlike local files, dataset samples never use the thread pool.
+        - stream_jsonl appends every sample's record to sample_results_<model>_<language>.jsonl,
+          ending with a '__summary__' record, and keeps only summary fields in memory.
+        - flush_every writes a language's part file once FLUSH_TARGET_BYTES of its samples
+          have been collected, or after 4 * flush_every samples, whichever comes first.
+        - Samples shorter than min_code_size or longer than max_code_size characters are skipped
+          before tokenization (0 disables either bound).
         """
         try:
             # Lazy import to avoid hard dependency if unused
@@ -917,7 +1583,7 @@ class QuickMultiLanguageAnalyzer:
         normalized_fixed_language = None
         if fixed_language:
             normalized_fixed_language = self._normalize_language_name(fixed_language)
-            if not normalized_fixed_language or normalized_fixed_language not in self.parsers:
+            if not normalized_fixed_language or self._get_parser(normalized_fixed_language) is None:
                 print(f"Error: Unsupported language: {fixed_language}")
                 return {}
 
@@ -961,128 +1627,187 @@ class QuickMultiLanguageAnalyzer:
                     'total_code_size': 0,
                     'total_analysis_time': 0.0,
                     'avg_processing_speed': 0.0,  # will compute later
-                    'files': []
+                    'files': [],
+                    # Score total of 'files', kept as they are added
+                    '_score_sum': 0.0
                 }
         # Per-language chunking helpers
         lang_chunk_index: Dict[str, int] = {}
         lang_files_since_flush: Dict[str, int] = {}
+        lang_bytes_since_flush: Dict[str, int] = {}
         lang_chunk_start_time: Dict[str, float] = {}
 
-        processed = 0
-        overall_start_time = time.time()
-        iterator = dataset if streaming else iter(dataset)
+        def record_sample(stats: Dict, language: str, sample_id: Any, code_size: int, score: float, aligned_count: int, total_count: int, rules_list: List[UnalignedRule], sample_time: float):
+            record = None
+            if rules_list or stream_jsonl:
+                record = {
+                    'file': sample_id,
+                    'score': score,
+                    'total_rules': total_count,
+                    'aligned_rules': aligned_count,
+                    'unaligned_rules': rules_list,
+                    'code_size': code_size,
+                    'analysis_time': sample_time,
+                    'processing_speed': code_size / sample_time if sample_time > 0 else 0
+                }
+            if stream_jsonl:
+                jsonl_file = jsonl_files.get(language)
+                if jsonl_file is None:
+                    jsonl_path = Path(output_dir) / f"sample_results_{self.model_name}_{language}.jsonl"
+                    jsonl_path.parent.mkdir(parents=True, exist_ok=True)
+                    jsonl_file = jsonl_files[language] = open(jsonl_path, 'wb', buffering=JSONL_BUFFER_BYTES)
+                    print(f"Streaming per-sample results to: {jsonl_path}")
+                jsonl_file.write(_json_line(record))
+                # Full record is on disk; keep only the summary fields in memory
+                del record['unaligned_rules']
+            # Add to report list only if not perfect
+            if rules_list:
+                stats['files'].append(record)
+                stats['_score_sum'] += score
+
+            lang_files_since_flush[language] += 1
+            lang_bytes_since_flush[language] += code_size
+
+            # Flush per language if configured; sized by collected bytes so languages with
+            # small samples do not flush far more often than ones with large samples
+            if flush_every and (lang_bytes_since_flush[language] >= self.FLUSH_TARGET_BYTES
+                                or lang_files_since_flush[language] >= 4 * flush_every):
+                lang_chunk_index[language] += 1
+                files = stats['files']
+                # Chunk totals in a single pass over the buffered records
+                chunk_total_rules = chunk_total_aligned = chunk_total_size = 0
+                for r in files:
+                    chunk_total_rules += r['total_rules']
+                    chunk_total_aligned += r['aligned_rules']
+                    chunk_total_size += r['code_size']
+                chunk_total_time = time.perf_counter() - lang_chunk_start_time[language]
+                chunk_avg_score = (stats['_score_sum'] / len(files)) if files else 0.0
+                chunk_avg_speed = chunk_total_size / chunk_total_time if chunk_total_time > 0 else 0
 
-        try:
+                language_chunk_result = {
+                    'language': language,
+                    'file_count': len(files),
+                    'avg_score': chunk_avg_score,
+                    'total_rules': chunk_total_rules,
+                    'total_aligned': chunk_total_aligned,
+                    'overall_alignment': (chunk_total_aligned / chunk_total_rules * 100) if chunk_total_rules > 0 else 0,
+                    'total_code_size': chunk_total_size,
+                    'total_analysis_time': chunk_total_time,
+                    'avg_processing_speed': chunk_avg_speed,
+                    'files': files
+                }
+
+                self._save_results({language: language_chunk_result}, [], output_dir, chunk_total_time, suffix=f"_{language}_part_{lang_chunk_index[language]}", quiet=self.QUIET_CHUNKS, compact=True)
+
+                logger.debug("flushed %s part %d: %d samples, %d bytes, %.2fs", language, lang_chunk_index[language],
+                             lang_files_since_flush[language], lang_bytes_since_flush[language], chunk_total_time)
+
+                # Reset per-language buffers
+                stats['files'] = []
+                stats['_score_sum'] = 0.0
+                lang_files_since_flush[language] = 0
+                lang_bytes_since_flush[language] = 0
+                lang_chunk_start_time[language] = time.perf_counter()
+
+        # Per-language NDJSON outputs when stream_jsonl is set, opened on first sample
+        jsonl_files: Dict[str, Any] = {}
+
+        processed = 0
+        overall_start_time = time.perf_counter()
+        # Dataset download/decompression runs on a background thread, overlapping with analysis
+        iterator = _prefetch_iter(dataset, maxsize=4 * max(1, encode_batch_size))
+
+        def iter_sample_batches():
+            """Yield (language, samples) once encode_batch_size samples of a language can share one tokenizer call."""
+            nonlocal processed
+            # Samples wait per language until their batch is full
+            pending: Dict[str, List[Tuple[Any, str, None]]] = {}
+            # Whether each language's parser loads, resolved once per language
+            parser_usable: Dict[str, bool] = {}
             pbar = tqdm(iterator, desc="Analyzing HF samples", unit="samples")
             for i, example in enumerate(pbar):
                 if limit is not None and processed >= limit:
                     break
 
                 code = example.get(text_column)
-                if not code or not isinstance(code, str) or not code.strip():
+                if not code or not isinstance(code, str) or code.isspace():
+                    continue
+                # Near-empty samples are noise and one huge sample stalls its whole encode batch
+                code_size = len(code)
+                if code_size < min_code_size or (max_code_size and code_size > max_code_size):
                     continue
 
                 # Determine language
                 language = normalized_fixed_language
                 if not language and language_field:
                     language = self._normalize_language_name(example.get(language_field))
-                if not language or language not in self.parsers:
+                if not language:
+                    continue
+                usable = parser_usable.get(language)
+                if usable is None:
+                    usable = parser_usable[language] = self._get_parser(language) is not None
+                if not usable:
                     # Skip unsupported/unknown languages
                     continue
 
                 ensure_lang_bucket(language)
-
-                code_size = len(code)
-                sample_start = time.time()
-                score, details = self.calculate_rule_level_alignment(code, language)
-                sample_time = time.time() - sample_start
-
-                aligned_count = sum(1 for d in details.values() if d['fully_aligned'])
-
-                # Only keep unaligned rules for dataset path as well
-                rules_list = [
-                    {
-                        'rule_key': rk,
-                        'type': rd.get('type'),
-                        'start_byte': rd.get('start_byte'),
-                        'end_byte': rd.get('end_byte'),
-                        'start_aligned': rd.get('start_aligned'),
-                        'end_aligned': rd.get('end_aligned'),
-                        'fully_aligned': rd.get('fully_aligned'),
-                        'text_preview': rd.get('text_preview')
-                    }
-                    for rk, rd in details.items() if not rd.get('fully_aligned')
-                ]
-                # Add to report list only if not perfect
-                if rules_list:
-                    per_language_stats[language]['files'].append({
-                        'file': example.get('id', f'sample_{i}'),
-                        'score': score,
-                        'total_rules': len(details),
-                        'aligned_rules': aligned_count,
-                        'unaligned_rules': rules_list,
-                        'code_size': code_size,
-                        'analysis_time': sample_time,
-                        'processing_speed': code_size / sample_time if sample_time > 0 else 0
-                    })
-
-                per_language_stats[language]['file_count'] += 1
-                per_language_stats[language]['total_rules'] += len(details)
-                per_language_stats[language]['total_aligned'] += aligned_count
-                per_language_stats[language]['total_code_size'] += code_size
-                per_language_stats[language]['total_analysis_time'] += sample_time
-
+                batch = pending.setdefault(language, [])
+                batch.append((example.get('id', f'sample_{i}'), code, None))
                 processed += 1
-
-                # Initialize chunk timers/counters
-                if language not in lang_chunk_index:
-                    lang_chunk_index[language] = 0
-                    lang_files_since_flush[language] = 0
-                    lang_chunk_start_time[language] = time.time()
-
-                lang_files_since_flush[language] += 1
-
-                # Flush per language if configured
-                if flush_every and lang_files_since_flush[language] >= flush_every:
-                    lang_chunk_index[language] += 1
-                    files = per_language_stats[language]['files']
-                    chunk_total_rules = sum(r['total_rules'] for r in files)
-                    chunk_total_aligned = sum(r['aligned_rules'] for r in files)
-                    chunk_total_size = sum(r['code_size'] for r in files)
-                    chunk_total_time = time.time() - lang_chunk_start_time[language]
-                    chunk_avg_score = (sum(r['score'] for r in files) / len(files)) if files else 0.0
-                    chunk_avg_speed = chunk_total_size / chunk_total_time if chunk_total_time > 0 else 0
-
-                    language_chunk_result = {
-                        'language': language,
-                        'file_count': len(files),
-                        'avg_score': chunk_avg_score,
-                        'total_rules': chunk_total_rules,
-                        'total_aligned': chunk_total_aligned,
-                        'overall_alignment': (chunk_total_aligned / chunk_total_rules * 100) if chunk_total_rules > 0 else 0,
-                        'total_code_size': chunk_total_size,
-                        'total_analysis_time': chunk_total_time,
-                        'avg_processing_speed': chunk_avg_speed,
-                        'files': files
-                    }
-
-                    self._save_results({language: language_chunk_result}, [], output_dir, chunk_total_time, suffix=f"_{language}_part_{lang_chunk_index[language]}")
-
-                    # Reset per-language buffers
-                    per_language_stats[language]['files'] = []
-                    lang_files_since_flush[language] = 0
-                    lang_chunk_start_time[language] = time.time()
-        finally:
-            # tqdm will close itself when pbar goes out of scope
-            pass
+                if len(batch) >= encode_batch_size:
+                    yield language, pending.pop(language)
+            for language, batch in pending.items():
+                yield language, batch
+
+        def record_batch(language: str, batch_results: List[Tuple]):
+            if not batch_results:
+                return
+            stats = per_language_stats[language]
+            # Initialize chunk timers/counters
+            if language not in lang_chunk_index:
+                lang_chunk_index[language] = 0
+                lang_files_since_flush[language] = 0
+                lang_bytes_since_flush[language] = 0
+                lang_chunk_start_time[language] = time.perf_counter()
+            for sample_result in batch_results:
+                record_sample(stats, language, *sample_result)
+            # Aggregate counters are updated once per batch, not per sample
+            _, code_sizes, _, aligned_counts, total_counts, _, sample_times = zip(*batch_results)
+            stats['file_count'] += len(batch_results)
+            stats['total_rules'] += sum(total_counts)
+            stats['total_aligned'] += sum(aligned_counts)
+            stats['total_code_size'] += sum(code_sizes)
+            stats['total_analysis_time'] += sum(sample_times)
+
+        if not _use_worker_pool(workers):
+            for language, batch in iter_sample_batches():
+                record_batch(language, self._analyze_sample_batch(batch, language))
+        else:
+            max_workers = workers if workers > 1 else (os.cpu_count() or 1)
+            os.environ['ANALYZER_PER_FILE_TIMEOUT'] = str(max(1, int(per_file_timeout)))
+            mp_ctx = multiprocessing.get_context('spawn')
+            with mp_ctx.Pool(
+                max_workers,
+                initializer=_worker_init,
+                initargs=(self.model_name, self.emit_utf16_offsets, None, self.cache_dir, self.named_rules_only, self.dedup_cache_size)
+            ) as pool:
+                # Keep at most two batches per worker in flight so a streaming dataset
+                # is not read ahead of the workers
+                in_flight = deque()
+                for language, batch in iter_sample_batches():
+                    in_flight.append((language, pool.apply_async(_worker_analyze_samples, ((batch, language),))))
+                    if len(in_flight) >= 2 * max_workers:
+                        done_language, done = in_flight.popleft()
+                        record_batch(done_language, done.get())
+                while in_flight:
+                    done_language, done = in_flight.popleft()
+                    record_batch(done_language, done.get())
 
         # Post-process aggregates and print summaries
         results: Dict[str, Dict] = {}
         for lang, stats in per_language_stats.items():
             files = stats['files']
-            if not files:
-                continue
-            avg_score = sum(r['score'] for r in files) / len(files)
+            avg_score = stats['_score_sum'] / len(files) if files else 0.0
             avg_speed = stats['total_code_size'] / stats['total_analysis_time'] if stats['total_analysis_time'] > 0 else 0
 
             result = {
@@ -1097,40 +1822,21 @@ class QuickMultiLanguageAnalyzer:
                 'avg_processing_speed': avg_speed,
                 'files': files
             }
+            if lang in jsonl_files:
+                _finish_jsonl(jsonl_files.pop(lang), result)
+            if not files:
+                continue
 
-            print(f"\n{lang.upper()} (HF) Analysis Summary:")
-            print(f"  File count: {result['file_count']}")
-            print(f"  Average score: {result['avg_score']:.2f}%")
-            print(f"  Total rules: {result['total_rules']}")
-            print(f"  Total aligned: {result['total_aligned']}")
-            print(f"  Overall alignment rate: {result['overall_alignment']:.2f}%")
-            print(f"  Total code size: {result['total_code_size']/1024:.2f} KB")
-            print(f"  Total analysis time: {result['total_analysis_time']:.2f} seconds")
-            print(f"  Average processing speed: {result['avg_processing_speed']/1024:.2f} KB/sec")
+            sys.stdout.write(_language_summary_text(f"{lang.upper()} (HF)", result))
 
             results[lang] = result
 
-        overall_time = time.time() - overall_start_time
+        overall_time = time.perf_counter() - overall_start_time
 
         rankings = []
         if results:
-            print(f"\n{'='*60}")
-            print("Language Rankings (by average score)")
-            print(f"{'='*60}")
-            rankings = sorted(results.items(), key=lambda x: x[1]['avg_score'], reverse=True)
-            for i, (lang, result) in enumerate(rankings, 1):
-                print(f"{i:2d}. {lang:<12} {result['avg_score']:6.2f}% "
-                      f"(Files: {result['file_count']}, Rules: {result['total_rules']})")
-
-            print(f"\nTotal analysis time: {overall_time:.2f} seconds")
-
-            print(f"\n{'='*60}")
-            print("Language Processing Speed Rankings (KB/sec)")
-            print(f"{'='*60}")
-            speed_rankings = sorted(results.items(), key=lambda x: x[1]['avg_processing_speed'], reverse=True)
-            for i, (lang, result) in enumerate(speed_rankings, 1):
-                print(f"{i:2d}. {lang:<12} {result['avg_processing_speed']/1024:.2f} KB/sec "
-                      f"(Total size: {result['total_code_size']/1024:.2f} KB)")
+            rankings, rankings_text = _rankings_text(results, overall_time)
+            sys.stdout.write(rankings_text)
 
         # Save results (only detailed report)
         self._save_results(results, rankings, output_dir, overall_time)
@@ -1144,7 +1850,11 @@ class QuickMultiLanguageAnalyzer:
                     per_file_timeout: int = 10,
                     max_files: Optional[int] = None,
                     batch_size: int = 0,
-                    start_index: int = 0) -> Dict:
+                    start_index: int = 0,
+                    stream_jsonl: bool = False,
+                    rule_details: bool = True,
+                    file_timing: bool = True,
+                    use_processes: bool = False) -> Dict:
         """Run analysis"""
         available_languages = self.get_available_languages()
         
@@ -1164,79 +1874,70 @@ class QuickMultiLanguageAnalyzer:
         print(f"Analyzing languages: {' '.join(target_languages)}")
         
         # Record overall analysis start time
-        overall_start_time = time.time()
+        overall_start_time = time.perf_counter()
         
         results = {}
         for language in target_languages:
-            result = self.analyze_language_files(code_dir, language, flush_every=flush_every, output_dir=output_dir, workers=workers, per_file_timeout=per_file_timeout, max_files=max_files, batch_size=batch_size, start_index=start_index)
+            result = self.analyze_language_files(code_dir, language, flush_every=flush_every, output_dir=output_dir, workers=workers, per_file_timeout=per_file_timeout, max_files=max_files, batch_size=batch_size, start_index=start_index, stream_jsonl=stream_jsonl, rule_details=rule_details, file_timing=file_timing, use_processes=use_processes)
             if result:
                 results[language] = result
         
         # Calculate overall analysis time
-        overall_analysis_time = time.time() - overall_start_time
+        overall_analysis_time = time.perf_counter() - overall_start_time
         
         # Generate rankings
         rankings = []
         if results:
-            print(f"\n{'='*60}")
-            print("Language Rankings (by average score)")
-            print(f"{'='*60}")
-            
-            rankings = sorted(results.items(), key=lambda x: x[1]['avg_score'], reverse=True)
-            for i, (lang, result) in enumerate(rankings, 1):
-                print(f"{i:2d}. {lang:<12} {result['avg_score']:6.2f}% "
-                      f"(Files: {result['file_count']}, Rules: {result['total_rules']})")
-            
-            # Display overall analysis time
-            print(f"\nTotal analysis time: {overall_analysis_time:.2f} seconds")
-            
-            # Calculate and display processing speed ranking for each language
-            print(f"\n{'='*60}")
-            print("Language Processing Speed Rankings (KB/sec)")
-            print(f"{'='*60}")
-            
-            speed_rankings = sorted(results.items(), key=lambda x: x[1]['avg_processing_speed'], reverse=True)
-            for i, (lang, result) in enumerate(speed_rankings, 1):
-                print(f"{i:2d}. {lang:<12} {result['avg_processing_speed']/1024:.2f} KB/sec "
-                      f"(Total size: {result['total_code_size']/1024:.2f} KB)")
+            rankings, rankings_text = _rankings_text(results, overall_analysis_time)
+            sys.stdout.write(rankings_text)
         
         # Save results to files (only detailed report)
         self._save_results(results, rankings, output_dir, overall_analysis_time)
         
         return results
     
-    def _save_results(self, results: Dict, rankings: List, output_dir: str, overall_analysis_time: float, suffix: str = ""):
+    def _save_results(self, results: Dict, rankings: List, output_dir: str, overall_analysis_time: float, suffix: str = "", quiet: bool = False, compact: bool = False):
         """Save analysis results to files. Only writes detailed_analysis JSON.
 
         suffix: optional string to append to the detailed filename, e.g. "_python_part_1".
+        quiet: skip the "results saved" message.
+        compact: write JSON without indentation (used for machine-read part files).
         """
         output_path = Path(output_dir)
         output_path.mkdir(parents=True, exist_ok=True)
         
+        # Aggregate per-language totals in a single pass
+        summary = {
+            'total_languages': len(results),
+            'total_files': 0,
+            'total_rules': 0,
+            'total_aligned': 0,
+            'total_code_size': 0
+        }
+        for r in results.values():
+            summary['total_files'] += r['file_count']
+            summary['total_rules'] += r['total_rules']
+            summary['total_aligned'] += r['total_aligned']
+            summary['total_code_size'] += r['total_code_size']
+        summary['avg_processing_speed'] = summary['total_code_size'] / overall_analysis_time if overall_analysis_time > 0 else 0
+        
         # Save detailed results
         detailed_results = {
             'model': self.model_name,
             'timestamp': str(Path().resolve()),
             'overall_analysis_time': overall_analysis_time,
-            'summary': {
-                'total_languages': len(results),
-                'total_files': sum(r['file_count'] for r in results.values()),
-                'total_rules': sum(r['total_rules'] for r in results.values()),
-                'total_aligned': sum(r['total_aligned'] for r in results.values()),
-                'total_code_size': sum(r['total_code_size'] for r in results.values()),
-                'avg_processing_speed': sum(r['total_code_size'] for r in results.values()) / overall_analysis_time if overall_analysis_time > 0 else 0
-            },
+            'summary': summary,
             'languages': results,
             'rankings': []  # rankings omitted by request
         }
         
         # Save detailed report
         detailed_file = output_path / f"detailed_analysis_{self.model_name}{suffix}.json"
-        with open(detailed_file, 'w', encoding='utf-8') as f:
-            json.dump(detailed_results, f, ensure_ascii=False, indent=2)
+        with open(detailed_file, 'wb') as f:
+            f.write(_json_document(detailed_results, compact=compact))
         
-        print(f"\n📁 Analysis results saved to:")
-        print(f"  - Detailed report: {detailed_file}")
+        if not quiet:
+            sys.stdout.write(f"\n📁 Analysis results saved to:\n  - Detailed report: {detailed_file}\n")
 
 def estimate_processing_time(analyzer, language, avg_file_size, file_count):
     """Estimate time required to process a large number of files"""
@@ -1253,31 +1954,30 @@ def estimate_processing_time(analyzer, language, avg_file_size, file_count):
         print(f"Error: {language} language directory does not exist")
         return
     
-    # Find files
-    extensions = analyzer.language_configs[language]['extensions']
-    code_files = []
-    for ext in extensions:
-        code_files.extend(language_dir.glob(f"*{ext}"))
+    # Find files and total their sizes in one directory scan
+    suffixes = tuple(analyzer.language_configs[language]['extensions'])
+    found_files = 0
+    total_size = 0
+    with os.scandir(language_dir) as entries:
+        for entry in entries:
+            if entry.name.endswith(suffixes) and entry.is_file():
+                found_files += 1
+                total_size += entry.stat().st_size
     
-    if not code_files:
+    if not found_files:
         print(f"Error: No {language} files found")
         return
     
-    # Calculate average size of current files
-    total_size = 0
-    for file_path in code_files:
-        total_size += file_path.stat().st_size
-    
-    current_avg_size = total_size / len(code_files) if code_files else 0
+    current_avg_size = total_size / found_files
     
     # If no average file size provided, use current files' average size
     if avg_file_size <= 0:
         avg_file_size = current_avg_size
     
     # Run test analysis
-    start_time = time.time()
+    start_time = time.perf_counter()
     result = analyzer.analyze_language_files(code_dir, language)
-    test_time = time.time() - start_time
+    test_time = time.perf_counter() - start_time
     
     if not result:
         print(f"Error: Unable to analyze {language} files")
@@ -1346,12 +2046,19 @@ def main():
     parser.add_argument('--estimate', action='store_true', help='Estimate large-scale processing time')
     parser.add_argument('--file_count', type=int, default=1000000, help='Number of files for estimation')
     parser.add_argument('--avg_file_size', type=float, default=0, help='Average file size for estimation (bytes)')
-    parser.add_argument('--flush_every', type=int, default=5000, help='Write a detailed report every N files to reduce memory usage (0=disable)')
-    parser.add_argument('--workers', type=int, default=1, help='Number of worker processes for parallel analysis (1 = disable)')
-    parser.add_argument('--per_file_timeout', type=int, default=10, help='Per-file analysis timeout in seconds (skip files exceeding this)')
+    parser.add_argument('--flush_every', type=int, default=5000, help='Write a detailed report every N files to reduce memory usage (0=disable); HF datasets flush per language by collected bytes, at most every 4N samples')
+    parser.add_argument('--workers', type=int, default=1, help='Number of workers for parallel analysis (0 or 1 = disable, -1 = auto: one per 128 files, up to one per CPU); local runs under 10,000 files use threads, larger runs and HF datasets use processes')
+    parser.add_argument('--use_processes', action='store_true', help='Always use worker processes for local files, even for runs that would use threads')
+    parser.add_argument('--per_file_timeout', type=int, default=10, help='Per-file analysis timeout in seconds (skip files exceeding this); with threaded workers it only bounds parsing')
     parser.add_argument('--max_files', type=int, default=None, help='Maximum number of files to analyze (across this run)')
     parser.add_argument('--batch_size', type=int, default=0, help='Analyze files in fixed-size batches (e.g., 5000) and save after each batch')
     parser.add_argument('--start_index', type=int, default=0, help='Resume offset: 0-based file index to start from (e.g., 190000)')
+    parser.add_argument('--stream_jsonl', action='store_true', help='Write each file result to a per-language NDJSON file as it completes instead of holding full records in memory')
+    parser.add_argument('--no_rule_details', dest='rule_details', action='store_false', help='Omit the per-rule unaligned_rules lists from file records (aggregates only)')
+    parser.add_argument('--no_file_timing', dest='file_timing', action='store_false', help='Skip per-file timing and omit analysis_time/processing_speed from file records')
+    parser.add_argument('--cache_dir', type=str, default=None, help='Cache parse rules and token offsets here (e.g., .analyzer_cache) to skip re-parsing unchanged files')
+    parser.add_argument('--named_rules_only', action='store_true', help='Count only named tree-sitter nodes as rules (skip keywords and punctuation)')
+    parser.add_argument('--dedup_cache_size', type=int, default=0, help='Reuse results for up to N recently seen identical HF dataset samples per process (0=disable)')
 
     # HuggingFace dataset options
     parser.add_argument('--hf_dataset', type=str, help='HuggingFace dataset name (e.g., bigcode/the-stack)')
@@ -1365,6 +2072,9 @@ def main():
     parser.add_argument('--no_hf_streaming', dest='hf_streaming', action='store_false', help='Disable streaming mode')
     parser.set_defaults(hf_streaming=True)
     parser.add_argument('--hf_token', type=str, default=None, help='HuggingFace auth token (if required)')
+    parser.add_argument('--hf_encode_batch', type=int, default=1000, help='Samples per language tokenized together in one tokenizer call')
+    parser.add_argument('--hf_min_size', type=int, default=16, help='Skip dataset samples shorter than this many characters')
+    parser.add_argument('--hf_max_size', type=int, default=2_000_000, help='Skip dataset samples longer than this many characters (0=no limit)')
     
     args = parser.parse_args()
     
@@ -1375,7 +2085,7 @@ def main():
     
     # If estimation mode, only run once (use --model)
     if args.estimate:
-        analyzer = QuickMultiLanguageAnalyzer(model_name=args.model, emit_utf16_offsets=args.emit_utf16)
+        analyzer = QuickMultiLanguageAnalyzer(model_name=args.model, emit_utf16_offsets=args.emit_utf16, cache_dir=args.cache_dir, named_rules_only=args.named_rules_only, dedup_cache_size=args.dedup_cache_size)
         # If estimation mode, only run estimation function
         language = args.language if args.language else 'python'
         estimate_processing_time(analyzer, language, args.avg_file_size, args.file_count)
@@ -1396,29 +2106,35 @@ def main():
             print(f"Running analysis with tokenizer model: {mdl}")
             print(f"{'='*80}")
 
-            analyzer = QuickMultiLanguageAnalyzer(model_name=mdl, emit_utf16_offsets=args.emit_utf16)
+            analyzer = QuickMultiLanguageAnalyzer(model_name=mdl, emit_utf16_offsets=args.emit_utf16, cache_dir=args.cache_dir, named_rules_only=args.named_rules_only, dedup_cache_size=args.dedup_cache_size)
 
-        if args.hf_dataset:
+            if args.hf_dataset:
                 _ = analyzer.analyze_hf_dataset(
-                dataset_name=args.hf_dataset,
-                split=args.hf_split,
-                text_column=args.hf_text_column,
-                dataset_config=args.hf_config,
-                fixed_language=args.hf_language,
-                language_field=args.hf_language_field,
-                limit=args.hf_limit,
-                streaming=args.hf_streaming,
-                use_auth_token=args.hf_token,
-                output_dir=args.output_dir,
+                    dataset_name=args.hf_dataset,
+                    split=args.hf_split,
+                    text_column=args.hf_text_column,
+                    dataset_config=args.hf_config,
+                    fixed_language=args.hf_language,
+                    language_field=args.hf_language_field,
+                    limit=args.hf_limit,
+                    streaming=args.hf_streaming,
+                    use_auth_token=args.hf_token,
+                    output_dir=args.output_dir,
                     flush_every=args.flush_every,
-            )
-        else:
-            if args.language:
-                target_languages = [args.language]
-            elif args.all_languages:
-                target_languages = None  # Analyze all available languages
+                    encode_batch_size=args.hf_encode_batch,
+                    workers=args.workers,
+                    per_file_timeout=args.per_file_timeout,
+                    stream_jsonl=args.stream_jsonl,
+                    min_code_size=args.hf_min_size,
+                    max_code_size=args.hf_max_size,
+                )
             else:
-                target_languages = ['python']  # Default to analyzing only Python
+                if args.language:
+                    target_languages = [args.language]
+                elif args.all_languages:
+                    target_languages = None  # Analyze all available languages
+                else:
+                    target_languages = ['python']  # Default to analyzing only Python
 
                 run_results = analyzer.run_analysis(
                     args.code_dir,
@@ -1430,6 +2146,10 @@ def main():
                     max_files=args.max_files,
                     batch_size=args.batch_size,
                     start_index=args.start_index,
+                    stream_jsonl=args.stream_jsonl,
+                    rule_details=args.rule_details,
+                    file_timing=args.file_timing,
+                    use_processes=args.use_processes,
                 )
                 # Save simple per-language avg_score/overall_alignment for comparison
                 per_model_language_summary[mdl] = {
@@ -1452,8 +2172,8 @@ def main():
             out_dir = Path(args.output_dir)
             out_dir.mkdir(parents=True, exist_ok=True)
             index_file = out_dir / 'multi_model_summary.json'
-            with open(index_file, 'w', encoding='utf-8') as f:
-                json.dump(multi_model_index, f, ensure_ascii=False, indent=2)
+            with open(index_file, 'wb') as f:
+                f.write(_json_document(multi_model_index))
             print(f"\n🧭 Multi-model summary index saved to: {index_file}")
         except Exception as e:
             print(f"Failed to write multi-model summary index: {e}")
@@ -1461,26 +2181,25 @@ def main():
         # Additionally, write a cross-model alignment comparison per language (if local files path used)
         if per_model_language_summary:
             try:
-                # Build a language-centric view
-                languages = set()
-                for model_summary in per_model_language_summary.values():
-                    languages.update(model_summary.keys())
+                # Build a language-centric view in one pass over the per-model summaries
+                data = {}
+                for mdl, model_summary in per_model_language_summary.items():
+                    for lang, lang_summary in model_summary.items():
+                        data.setdefault(lang, {})[mdl] = lang_summary
+                # Models without results for a language still get an (empty) cell
+                for row in data.values():
+                    for mdl in models_to_run:
+                        row.setdefault(mdl, {})
 
                 comparison = {
-                    'languages': sorted(list(languages)),
+                    'languages': sorted(data),
                     'models': models_to_run,
-                    'data': {
-                        lang: {
-                            mdl: per_model_language_summary.get(mdl, {}).get(lang, {})
-                            for mdl in models_to_run
-                        }
-                        for lang in languages
-                    }
+                    'data': data
                 }
 
                 cmp_file = Path(args.output_dir) / 'model_alignment_comparison.json'
-                with open(cmp_file, 'w', encoding='utf-8') as f:
-                    json.dump(comparison, f, ensure_ascii=False, indent=2)
+                with open(cmp_file, 'wb') as f:
+                    f.write(_json_document(comparison))
                 print(f"Alignment comparison across models saved to: {cmp_file}")
             except Exception as e:
                 print(f"Failed to write model alignment comparison: {e}")
@@ -22,6 +22,17 @@ import multiprocessing
 from typing import Any
 import signal
 
+try:
+    import orjson
+except ImportError:  # orjson is optional; reports fall back to the stdlib encoder
+    orjson = None
+
+def _json_document(document: Dict[str, Any]) -> bytes:
+    """Serialize a report document as indented UTF-8 JSON."""
+    if orjson is not None:
+        return orjson.dumps(document, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(document, ensure_ascii=False, indent=2).encode('utf-8')
+
 # Global worker analyzer for process pool
 WORKER_ANALYZER: Optional["QuickMultiLanguageAnalyzer"] = None
 
@@ -1223,8 +1234,8 @@ class QuickMultiLanguageAnalyzer:
         
         # Save detailed report
         detailed_file = output_path / f"detailed_analysis_{self.model_name}{suffix}.json"
-        with open(detailed_file, 'w', encoding='utf-8') as f:
-            json.dump(detailed_results, f, ensure_ascii=False, indent=2)
+        with open(detailed_file, 'wb') as f:
+            f.write(_json_document(detailed_results))
         
         print(f"\n📁 Analysis results saved to:")
         print(f"  - Detailed report: {detailed_file}")
@@ -1441,8 +1452,8 @@ def main():
             out_dir = Path(args.output_dir)
             out_dir.mkdir(parents=True, exist_ok=True)
             index_file = out_dir / 'multi_model_summary.json'
-            with open(index_file, 'w', encoding='utf-8') as f:
-                json.dump(multi_model_index, f, ensure_ascii=False, indent=2)
+            with open(index_file, 'wb') as f:
+                f.write(_json_document(multi_model_index))
             print(f"\n🧭 Multi-model summary index saved to: {index_file}")
         except Exception as e:
             print(f"Failed to write multi-model summary index: {e}")
@@ -1468,8 +1479,8 @@ def main():
                 }
 
                 cmp_file = Path(args.output_dir) / 'model_alignment_comparison.json'
-                with open(cmp_file, 'w', encoding='utf-8') as f:
-                    json.dump(comparison, f, ensure_ascii=False, indent=2)
+                with open(cmp_file, 'wb') as f:
+                    f.write(_json_document(comparison))
                 print(f"Alignment comparison across models saved to: {cmp_file}")
             except Exception as e:
                 print(f"Failed to write model alignment comparison: {e}")
@@ -12,6 +12,8 @@ import os
 import sys
 import argparse
 import subprocess
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
 from pathlib import Path
 
 
@@ -23,33 +25,40 @@ SUPPORTED_LANGUAGES = [
 
 def find_code_output_dirs(base_dir: Path):
     """Yield subdirectories in base_dir whose names end with _code_output."""
-    if not base_dir.exists() or not base_dir.is_dir():
+    # scandir entries carry the file type, so only symlinks need a stat() to resolve
+    try:
+        with os.scandir(base_dir) as entries:
+            return [Path(entry.path) for entry in entries
+                    if entry.name.endswith("_code_output") and entry.is_dir()]
+    except (FileNotFoundError, NotADirectoryError, PermissionError):
         return []
-    return [p for p in base_dir.iterdir() if p.is_dir() and p.name.endswith("_code_output")]
 
 
+_LANG_ALIASES = {
+    "python": "python", "py": "python",
+    "javascript": "javascript", "js": "javascript", "node": "javascript",
+    "typescript": "typescript", "ts": "typescript",
+    "java": "java",
+    "c": "c",
+    "c++": "cpp", "cpp": "cpp", "cxx": "cpp",
+    "c#": "csharp", "csharp": "csharp", "cs": "csharp",
+    "go": "go", "golang": "go",
+    "ruby": "ruby", "rb": "ruby",
+    "rust": "rust", "rs": "rust",
+    "scala": "scala",
+}
+
+
+@lru_cache(maxsize=None)
 def normalize_language_name(name: str) -> str | None:
     """Map various aliases to our supported language keys."""
     if not name:
         return None
-    n = name.strip().lower()
-    aliases = {
-        "python": "python", "py": "python",
-        "javascript": "javascript", "js": "javascript", "node": "javascript",
-        "typescript": "typescript", "ts": "typescript",
-        "java": "java",
-        "c": "c",
-        "c++": "cpp", "cpp": "cpp", "cxx": "cpp",
-        "c#": "csharp", "csharp": "csharp", "cs": "csharp",
-        "go": "go", "golang": "go",
-        "ruby": "ruby", "rb": "ruby",
-        "rust": "rust", "rs": "rust",
-        "scala": "scala",
-    }
-    lang = aliases.get(n)
+    lang = _LANG_ALIASES.get(name.strip().lower())
     return lang if lang in SUPPORTED_LANGUAGES else None
 
 
+@lru_cache(maxsize=None)
 def infer_language_from_dir(dir_name: str) -> str | None:
     """Infer language from a directory name like '<lang>_code_output'."""
     base = dir_name
@@ -64,8 +73,13 @@ def run_analyzer(analyzer_path: Path,
                  output_dir: Path,
                  flush_every: int,
                  models: list[str] | None,
-                 extra_args: list[str] | None = None) -> int:
-    """Run analyzer.py once for given args. Returns process return code."""
+                 extra_args: list[str] | None = None,
+                 capture_output: bool = False) -> int:
+    """Run analyzer.py once for given args. Returns process return code.
+
+    With capture_output the run's output is collected and printed in one piece
+    when it finishes, so concurrent runs do not interleave.
+    """
     cmd = [sys.executable, str(analyzer_path),
            "--language", language,
            "--code_dir", str(code_dir),
@@ -78,10 +92,16 @@ def run_analyzer(analyzer_path: Path,
     if extra_args:
         cmd += list(extra_args)
 
-    print("\n" + "=" * 100)
-    print(f"Running analyzer for language={language} | code_dir={code_dir.name} | output_dir={output_dir}")
-    print("=" * 100)
-    proc = subprocess.run(cmd)
+    header = ("\n" + "=" * 100 + "\n"
+              f"Running analyzer for language={language} | code_dir={code_dir.name} | output_dir={output_dir}\n"
+              + "=" * 100 + "\n")
+    if not capture_output:
+        sys.stdout.write(header)
+        sys.stdout.flush()
+        return subprocess.run(cmd).returncode
+    proc = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, errors="replace")
+    sys.stdout.write(header + proc.stdout)
+    sys.stdout.flush()
     return proc.returncode
 
 
@@ -99,6 +119,9 @@ def main():
                         help="Flush detailed report every N files (0 to disable)")
     parser.add_argument("--models", nargs="+", default=None,
                         help="Optional list of tokenizer models to run (defaults to analyzer's --model)")
+    parser.add_argument("--parallel", type=int, default=1,
+                        help="Analyzer runs to execute at once (default 1; 0 = one per CPU, capped at the number of runs). "
+                             "With more than one, each run's output is shown when it finishes")
     parser.add_argument("--extra", nargs=argparse.REMAINDER,
                         help="Extra args passed through to analyzer.py (must come after --)")
 
@@ -118,8 +141,8 @@ def main():
         print(f"No *_code_output directories found under {base_dir}")
         return 1
 
-    total = 0
-    failures = 0
+    # Collect every (dataset folder, language) run first, then execute them on a bounded pool
+    jobs = []
     for code_dir in targets:
         # Determine languages to run for this folder
         languages = args.languages
@@ -142,8 +165,17 @@ def main():
 
             lang_out = dataset_out / language
             lang_out.mkdir(parents=True, exist_ok=True)
+            jobs.append((code_dir, language, lang_out))
 
-            rc = run_analyzer(
+    total = len(jobs)
+    failures = 0
+    parallel = args.parallel if args.parallel > 0 else (os.cpu_count() or 1)
+    parallel = max(1, min(parallel, total))
+    # Threads suffice: each one just waits on its analyzer subprocess
+    with ThreadPoolExecutor(max_workers=parallel) as executor:
+        futures = {
+            executor.submit(
+                run_analyzer,
                 analyzer_path=analyzer_path,
                 code_dir=code_dir,
                 language=language,
@@ -151,8 +183,13 @@ def main():
                 flush_every=args.flush_every,
                 models=args.models,
                 extra_args=args.extra,
-            )
-            total += 1
+                capture_output=parallel > 1,
+            ): (code_dir, language)
+            for code_dir, language, lang_out in jobs
+        }
+        for future in as_completed(futures):
+            code_dir, language = futures[future]
+            rc = future.result()
             if rc != 0:
                 print(f"❌ Failed: {code_dir.name} | {language} (rc={rc})")
                 failures += 1
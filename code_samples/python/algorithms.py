@@ -26,29 +26,50 @@ def selection_sort(arr):
         arr[i], arr[min_idx] = arr[min_idx], arr[i]
     return arr
 
-def insertion_sort(arr):
-    """插入排序"""
-    for i in range(1, len(arr)):
+def insertion_sort(arr, lo=0, hi=None):
+    """插入排序（可只排序 arr[lo:hi+1] 子区间）"""
+    if hi is None:
+        hi = len(arr) - 1
+    for i in range(lo + 1, hi + 1):
         key = arr[i]
         j = i-1
         # 将大于key的元素向右移动
-        while j >= 0 and key < arr[j]:
+        while j >= lo and key < arr[j]:
             arr[j+1] = arr[j]
             j -= 1
         arr[j+1] = key
     return arr
 
 def quick_sort(arr):
-    """快速排序"""
-    if len(arr) <= 1:
-        return arr
-    
-    pivot = arr[len(arr) // 2]
-    left = [x for x in arr if x < pivot]
-    middle = [x for x in arr if x == pivot]
-    right = [x for x in arr if x > pivot]
-    
-    return quick_sort(left) + middle + quick_sort(right)
+    """快速排序（原地 Hoare 划分）"""
+    _quick_sort(arr, 0, len(arr) - 1)
+    return arr
+
+def _quick_sort(arr, lo, hi):
+    # 小区间直接用插入排序，减少递归开销
+    if hi - lo < 16:
+        insertion_sort(arr, lo, hi)
+        return
+    # 三数取中选择基准，避免有序输入退化为 O(n^2)
+    mid = (lo + hi) // 2
+    a, b, c = arr[lo], arr[mid], arr[hi]
+    if a < b:
+        pivot = b if b < c else (c if a < c else a)
+    else:
+        pivot = a if a < c else (c if b < c else b)
+    i, j = lo - 1, hi + 1
+    while True:
+        i += 1
+        while arr[i] < pivot:
+            i += 1
+        j -= 1
+        while arr[j] > pivot:
+            j -= 1
+        if i >= j:
+            break
+        arr[i], arr[j] = arr[j], arr[i]
+    _quick_sort(arr, lo, j)
+    _quick_sort(arr, j + 1, hi)
 
 def linear_search(arr, target):
     """线性搜索"""
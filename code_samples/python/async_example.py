@@ -15,13 +15,11 @@ async def main_async():
     """主异步函数"""
     print(f"开始时间: {time.strftime('%X')}")
     
-    # 创建任务
-    task1 = asyncio.create_task(say_after(1, '任务1完成'))
-    task2 = asyncio.create_task(say_after(2, '任务2完成'))
-    
-    # 等待任务完成
-    await task1
-    await task2
+    # 并发运行两个任务，gather 一次等待全部完成并传播异常
+    await asyncio.gather(
+        say_after(1, '任务1完成'),
+        say_after(2, '任务2完成'),
+    )
     
     print(f"结束时间: {time.strftime('%X')}")
 
@@ -3,6 +3,8 @@
 实现了几种基本的数据结构
 """
 
+from collections import deque
+
 class Stack:
     """栈的实现"""
     def __init__(self):
@@ -35,17 +37,16 @@ class Stack:
 class Queue:
     """队列的实现"""
     def __init__(self):
-        self.items = []
+        # deque 两端操作均为 O(1)，list.insert(0, ...) 为 O(n)
+        self.items = deque()
     
     def enqueue(self, item):
         """入队"""
-        self.items.insert(0, item)
+        self.items.append(item)
     
     def dequeue(self):
         """出队"""
-        if not self.is_empty():
-            return self.items.pop()
-        return None
+        return self.items.popleft() if self.items else None
     
     def is_empty(self):
         """检查队列是否为空"""
@@ -65,29 +66,29 @@ class LinkedList:
     """单向链表的实现"""
     def __init__(self):
         self.head = None
+        self.tail = None
     
     def append(self, data):
         """在链表末尾添加节点"""
         new_node = Node(data)
         
+        # 维护尾指针，追加无需从头遍历
         if self.head is None:
-            self.head = new_node
-            return
-        
-        last_node = self.head
-        while last_node.next:
-            last_node = last_node.next
-        
-        last_node.next = new_node
+            self.head = self.tail = new_node
+        else:
+            self.tail.next = new_node
+            self.tail = new_node
     
-    def print_list(self):
-        """打印链表"""
+    def __iter__(self):
+        """从头到尾遍历节点数据"""
         current = self.head
-        elements = []
         while current:
-            elements.append(str(current.data))
+            yield current.data
             current = current.next
-        return " -> ".join(elements)
+    
+    def print_list(self):
+        """打印链表"""
+        return " -> ".join(map(str, self))
 
 # 测试代码
 if __name__ == "__main__":
@@ -6,15 +6,22 @@
 import time
 import functools
 
+def format_elapsed(seconds):
+    """格式化耗时：不足1毫秒时以微秒显示"""
+    if seconds < 1e-3:
+        return f"{seconds * 1e6:.1f} 微秒"
+    return f"{seconds:.4f} 秒"
+
 # 基本装饰器
 def timer_decorator(func):
     """计时装饰器：记录函数执行时间"""
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
-        start_time = time.time()
+        # perf_counter 为单调高精度时钟，不受系统时间调整影响
+        start_time = time.perf_counter()
         result = func(*args, **kwargs)
-        end_time = time.time()
-        print(f"函数 {func.__name__} 执行时间: {end_time - start_time:.4f} 秒")
+        end_time = time.perf_counter()
+        print(f"函数 {func.__name__} 执行时间: {format_elapsed(end_time - start_time)}")
         return result
     return wrapper
 
@@ -36,13 +43,21 @@ class Memoize:
     """缓存装饰器：缓存函数结果以避免重复计算"""
     def __init__(self, func):
         self.func = func
-        self.cache = {}
+        # 委托给 C 实现的 lru_cache：支持关键字参数，且查表为单次原子操作
+        self._wrapped = functools.lru_cache(maxsize=None)(func)
         functools.update_wrapper(self, func)
     
-    def __call__(self, *args):
-        if args not in self.cache:
-            self.cache[args] = self.func(*args)
-        return self.cache[args]
+    def __call__(self, *args, **kwargs):
+        return self._wrapped(*args, **kwargs)
+    
+    @property
+    def cache(self):
+        """缓存统计信息（命中、未命中、当前条目数）"""
+        return self._wrapped.cache_info()
+    
+    def cache_clear(self):
+        """清空缓存"""
+        self._wrapped.cache_clear()
 
 # 使用装饰器的示例
 @timer_decorator
@@ -76,8 +91,8 @@ if __name__ == "__main__":
     print()
     
     print("测试缓存装饰器:")
-    start = time.time()
+    start = time.perf_counter()
     fib_result = fibonacci(30)
-    end = time.time()
+    end = time.perf_counter()
     print(f"斐波那契数列第30项: {fib_result}")
-    print(f"计算时间: {end - start:.4f} 秒")
\ No newline at end of file
+    print(f"计算时间: {format_elapsed(end - start)}")
\ No newline at end of file
@@ -8,6 +8,11 @@ import json
 import csv
 import pickle
 
+try:
+    import orjson  # 可选：Rust 实现的 JSON 库，一次性编码为 bytes
+except ImportError:
+    orjson = None
+
 def text_file_operations():
     """基本文本文件操作"""
     # 写入文本文件
@@ -16,17 +21,16 @@ def text_file_operations():
         f.write("这是第二行\n")
         f.write("这是第三行，包含中文字符\n")
     
-    # 读取文本文件
+    # 读取文本文件（只打开一次，逐行显示复用同一份内容）
     with open("temp_text.txt", "r", encoding="utf-8") as f:
         content = f.read()
-        print("读取整个文件:")
-        print(content)
+    print("读取整个文件:")
+    print(content)
     
     # 逐行读取
-    with open("temp_text.txt", "r", encoding="utf-8") as f:
-        print("\n逐行读取:")
-        for line in f:
-            print(f"  {line.strip()}")
+    print("\n逐行读取:")
+    for line in content.splitlines():
+        print(f"  {line.strip()}")
     
     # 追加内容
     with open("temp_text.txt", "a", encoding="utf-8") as f:
@@ -50,9 +54,13 @@ def json_file_operations():
         }
     }
     
-    # 写入JSON文件
-    with open("temp_data.json", "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=4)
+    # 写入JSON文件（orjson 只支持 2 空格缩进，两条路径保持一致）
+    if orjson is not None:
+        with open("temp_data.json", "wb") as f:
+            f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+    else:
+        with open("temp_data.json", "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
     
     # 读取JSON文件
     with open("temp_data.json", "r", encoding="utf-8") as f:
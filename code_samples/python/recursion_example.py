@@ -3,38 +3,52 @@
 展示了几种常见的递归算法实现
 """
 
+import functools
+
 def factorial(n):
     """计算阶乘的递归实现"""
     if n <= 1:
         return 1
     return n * factorial(n-1)
 
+@functools.lru_cache(maxsize=None)
 def fibonacci(n):
-    """计算斐波那契数列的递归实现"""
+    """计算斐波那契数列的递归实现（带记忆化，避免重复子问题）"""
     if n <= 0:
         return 0
     elif n == 1:
         return 1
     return fibonacci(n-1) + fibonacci(n-2)
 
-def binary_search(arr, target, left, right):
-    """二分查找的递归实现"""
-    if left > right:
-        return -1
+def fib_iter(n):
+    """计算斐波那契数列的迭代实现"""
+    a, b = 0, 1
+    for _ in range(n):
+        a, b = b, a + b
+    return a
+
+def binary_search(arr, target, left=0, right=None):
+    """二分查找（迭代实现，保留原递归版本的参数签名）"""
+    if right is None:
+        right = len(arr) - 1
     
-    mid = (left + right) // 2
+    while left <= right:
+        mid = (left + right) // 2
+        
+        if arr[mid] == target:
+            return mid
+        elif arr[mid] > target:
+            right = mid - 1
+        else:
+            left = mid + 1
     
-    if arr[mid] == target:
-        return mid
-    elif arr[mid] > target:
-        return binary_search(arr, target, left, mid-1)
-    else:
-        return binary_search(arr, target, mid+1, right)
+    return -1
 
 # 测试代码
 if __name__ == "__main__":
     print(f"5的阶乘是: {factorial(5)}")
     print(f"斐波那契数列第8项是: {fibonacci(8)}")
+    print(f"斐波那契数列第8项（迭代）是: {fib_iter(8)}")
     
     sorted_array = [1, 3, 5, 7, 9, 11, 13, 15]
     target = 7
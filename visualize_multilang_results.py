@@ -5,16 +5,30 @@
 """
 
 import json
+import argparse
+import matplotlib
+matplotlib.use('Agg')  # 仅输出文件，跳过 GUI 后端探测
 import matplotlib.pyplot as plt
-import seaborn as sns
-import pandas as pd
 import numpy as np
 from pathlib import Path
 
 # 设置中文字体和样式
 plt.rcParams['font.sans-serif'] = ['SimHei', 'Arial Unicode MS', 'DejaVu Sans']
 plt.rcParams['axes.unicode_minus'] = False
-plt.style.use('seaborn-v0_8')
+plt.style.use('seaborn-v0_8')  # matplotlib 自带的样式表，无需导入 seaborn
+plt.rcParams['path.simplify'] = True
+plt.rcParams['path.simplify_threshold'] = 1.0
+
+def _prepare_figure(fig, figsize):
+    """清空并复用已有 Figure（未传入时新建），避免每张图重复初始化后端"""
+    if fig is None:
+        return plt.figure(figsize=figsize)
+    fig.clf()
+    # clf() 不会重置 subplotpars，需恢复默认边距，避免沿用上一张图 tight_layout 的结果
+    fig.subplots_adjust(**{k: plt.rcParams[f'figure.subplot.{k}']
+                           for k in ('left', 'right', 'bottom', 'top', 'wspace', 'hspace')})
+    fig.set_size_inches(*figsize)
+    return fig
 
 def load_cross_language_report():
     """加载跨语言对比报告"""
@@ -27,24 +41,22 @@ def load_cross_language_report():
     with open(report_file, 'r', encoding='utf-8') as f:
         return json.load(f)
 
-def create_language_ranking_chart(report):
-    """创建语言排名图表"""
+def _draw_language_ranking_chart(report, fig):
+    """在 fig（Figure 或 SubFigure）上绘制语言排名图表"""
     
     rankings = report['language_rankings']
     
     # 准备数据
     languages = [r['language'].upper() for r in rankings]
-    scores = [r['avg_score'] for r in rankings]
+    scores = np.asarray([r['avg_score'] for r in rankings])
     colors = plt.cm.RdYlBu_r(np.linspace(0.2, 0.8, len(languages)))
     
     # 创建水平条形图
-    fig, ax = plt.subplots(figsize=(12, 8))
+    ax = fig.add_subplot()
     bars = ax.barh(languages, scores, color=colors, edgecolor='black', alpha=0.8)
     
     # 添加数值标签
-    for i, (bar, score) in enumerate(zip(bars, scores)):
-        ax.text(bar.get_width() + 0.5, bar.get_y() + bar.get_height()/2, 
-                f'{score:.2f}%', ha='left', va='center', fontweight='bold')
+    ax.bar_label(bars, labels=[f'{score:.2f}%' for score in scores], padding=3, fontweight='bold')
     
     # 添加平均线
     avg_score = report['analysis_summary']['average_score']
@@ -57,20 +69,25 @@ def create_language_ranking_chart(report):
                  fontsize=14, fontweight='bold', pad=20)
     
     # 设置x轴范围
-    ax.set_xlim(0, max(scores) * 1.15)
+    ax.set_xlim(0, scores.max() * 1.15)
     
     # 添加网格
     ax.grid(axis='x', alpha=0.3)
     ax.legend()
+
+def create_language_ranking_chart(report, fig=None):
+    """创建语言排名图表"""
+    
+    fig = _prepare_figure(fig, (12, 8))
+    _draw_language_ranking_chart(report, fig)
     
-    plt.tight_layout()
-    plt.savefig('results/multilang/language_ranking_chart.png', dpi=300, bbox_inches='tight')
-    plt.close()
+    fig.tight_layout()
+    fig.savefig('results/multilang/language_ranking_chart.png', dpi=300)
     
     print("语言排名图表已保存: results/multilang/language_ranking_chart.png")
 
-def create_rules_vs_alignment_scatter(report):
-    """创建规则数量vs对齐率散点图"""
+def _draw_rules_vs_alignment_scatter(report, fig):
+    """在 fig（Figure 或 SubFigure）上绘制规则数量vs对齐率散点图"""
     
     rankings = report['language_rankings']
     
@@ -81,7 +98,7 @@ def create_rules_vs_alignment_scatter(report):
     scores = [r['avg_score'] for r in rankings]
     
     # 创建散点图
-    fig, ax = plt.subplots(figsize=(12, 8))
+    ax = fig.add_subplot()
     
     # 使用分数作为颜色映射
     scatter = ax.scatter(total_rules, alignment_rates, 
@@ -95,7 +112,7 @@ def create_rules_vs_alignment_scatter(report):
                    fontsize=10, fontweight='bold')
     
     # 添加颜色条
-    cbar = plt.colorbar(scatter)
+    cbar = fig.colorbar(scatter, ax=ax)
     cbar.set_label('Rule-level Alignment Score (%)', fontsize=12, fontweight='bold')
     
     ax.set_xlabel('总规则数', fontsize=12, fontweight='bold')
@@ -105,15 +122,20 @@ def create_rules_vs_alignment_scatter(report):
     
     # 添加网格
     ax.grid(True, alpha=0.3)
+
+def create_rules_vs_alignment_scatter(report, fig=None):
+    """创建规则数量vs对齐率散点图"""
+    
+    fig = _prepare_figure(fig, (12, 8))
+    _draw_rules_vs_alignment_scatter(report, fig)
     
-    plt.tight_layout()
-    plt.savefig('results/multilang/rules_vs_alignment_scatter.png', dpi=300, bbox_inches='tight')
-    plt.close()
+    fig.tight_layout()
+    fig.savefig('results/multilang/rules_vs_alignment_scatter.png', dpi=300)
     
     print("规则数量vs对齐率散点图已保存: results/multilang/rules_vs_alignment_scatter.png")
 
-def create_language_category_analysis(report):
-    """创建语言类别分析图"""
+def _draw_language_category_analysis(report, fig):
+    """在 fig（Figure 或 SubFigure）上绘制语言类别分析图"""
     
     # 语言分类
     language_categories = {
@@ -121,26 +143,27 @@ def create_language_category_analysis(report):
         'Dynamic Typed': ['python', 'javascript', 'ruby']
     }
     
-    rankings = report['language_rankings']
+    # 一次性构建 DataFrame，按类别分组统计（pandas 只有这里用到，按需导入）
+    import pandas as pd
+    df = pd.DataFrame(report['language_rankings'])
+    category_of = {lang: category for category, langs in language_categories.items() for lang in langs}
+    grouped = df.groupby(df['language'].map(category_of))['avg_score']
     
     # 按类别统计
     category_stats = {}
-    for category, langs in language_categories.items():
-        scores = []
-        for ranking in rankings:
-            if ranking['language'] in langs:
-                scores.append(ranking['avg_score'])
-        
-        if scores:
-            category_stats[category] = {
-                'scores': scores,
-                'mean': np.mean(scores),
-                'std': np.std(scores),
-                'count': len(scores)
-            }
+    for category in language_categories:
+        if category not in grouped.groups:
+            continue
+        scores = grouped.get_group(category)
+        category_stats[category] = {
+            'scores': scores.tolist(),
+            'mean': scores.mean(),
+            'std': scores.std(ddof=0),
+            'count': len(scores)
+        }
     
     # 创建箱线图
-    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(15, 6))
+    ax1, ax2 = fig.subplots(1, 2)
     
     # 箱线图
     categories = list(category_stats.keys())
@@ -166,24 +189,25 @@ def create_language_category_analysis(report):
                    color=colors, alpha=0.7, edgecolor='black')
     
     # 添加数值标签
-    for bar, mean in zip(bars, means):
-        ax2.text(bar.get_x() + bar.get_width()/2, bar.get_height() + 0.5,
-                f'{mean:.2f}%', ha='center', va='bottom', fontweight='bold')
+    ax2.bar_label(bars, labels=[f'{mean:.2f}%' for mean in means], padding=3, fontweight='bold')
     
     ax2.set_ylabel('平均 Rule-level Alignment Score (%)', fontsize=12, fontweight='bold')
     ax2.set_title('按类型系统分类的平均对齐分数', fontsize=12, fontweight='bold')
     ax2.grid(True, alpha=0.3)
+
+def create_language_category_analysis(report, fig=None):
+    """创建语言类别分析图"""
+    
+    fig = _prepare_figure(fig, (15, 6))
+    _draw_language_category_analysis(report, fig)
     
-    plt.tight_layout()
-    plt.savefig('results/multilang/language_category_analysis.png', dpi=300, bbox_inches='tight')
-    plt.close()
+    fig.tight_layout()
+    fig.savefig('results/multilang/language_category_analysis.png', dpi=300)
     
     print("语言类别分析图已保存: results/multilang/language_category_analysis.png")
 
-def create_comprehensive_dashboard(report):
-    """创建综合仪表板"""
-    
-    fig = plt.figure(figsize=(20, 12))
+def _draw_comprehensive_dashboard(report, fig):
+    """在 fig（Figure 或 SubFigure）上绘制综合仪表板"""
     
     # 创建网格布局
     gs = fig.add_gridspec(3, 3, hspace=0.3, wspace=0.3)
@@ -203,10 +227,7 @@ def create_comprehensive_dashboard(report):
     
     colors_stats = ['#FF6B6B', '#4ECDC4', '#45B7D1', '#96CEB4']
     bars = ax1.bar(range(len(stats_labels)), stats_values, color=colors_stats, alpha=0.8)
-    
-    for bar, value in zip(bars, stats_values):
-        ax1.text(bar.get_x() + bar.get_width()/2, bar.get_height() + max(stats_values)*0.01,
-                f'{value:,}', ha='center', va='bottom', fontweight='bold')
+    ax1.bar_label(bars, labels=[f'{value:,}' for value in stats_values], padding=2, fontweight='bold')
     
     ax1.set_xticks(range(len(stats_labels)))
     ax1.set_xticklabels(stats_labels, rotation=45, ha='right')
@@ -221,10 +242,7 @@ def create_comprehensive_dashboard(report):
     
     bars = ax2.bar(languages, scores, color=plt.cm.RdYlBu_r(np.linspace(0.2, 0.8, 5)), 
                    alpha=0.8, edgecolor='black')
-    
-    for bar, score in zip(bars, scores):
-        ax2.text(bar.get_x() + bar.get_width()/2, bar.get_height() + 0.5,
-                f'{score:.2f}%', ha='center', va='bottom', fontweight='bold')
+    ax2.bar_label(bars, labels=[f'{score:.2f}%' for score in scores], padding=3, fontweight='bold')
     
     ax2.set_ylabel('Rule-level Alignment Score (%)')
     ax2.set_title('前5名语言对齐分数', fontweight='bold')
@@ -293,17 +311,52 @@ def create_comprehensive_dashboard(report):
              fontsize=12, ha='center', va='center',
              bbox=dict(boxstyle="round,pad=0.5", facecolor="lightgray", alpha=0.8))
     
-    plt.suptitle('多语言 Rule-level Alignment Score 综合分析仪表板', 
+    fig.suptitle('多语言 Rule-level Alignment Score 综合分析仪表板', 
                  fontsize=16, fontweight='bold', y=0.98)
+
+def create_comprehensive_dashboard(report, fig=None):
+    """创建综合仪表板"""
     
-    plt.savefig('results/multilang/comprehensive_dashboard.png', dpi=300, bbox_inches='tight')
-    plt.close()
+    fig = _prepare_figure(fig, (20, 12))
+    _draw_comprehensive_dashboard(report, fig)
+    
+    # 20x12 英寸的大图用 150 dpi 足够，编码时间和文件体积减半
+    fig.savefig('results/multilang/comprehensive_dashboard.png', dpi=150)
     
     print("综合仪表板已保存: results/multilang/comprehensive_dashboard.png")
 
+# 组合报告中各子图的位置
+COMBINED_PANELS = [
+    ((0, 0), _draw_language_ranking_chart),
+    ((0, 1), _draw_rules_vs_alignment_scatter),
+    ((1, 0), _draw_language_category_analysis),
+    ((1, 1), _draw_comprehensive_dashboard),
+]
+
+def create_combined_report(report, fig=None, dpi=150):
+    """在一个 2x2 Figure 中绘制全部四张图表，一次渲染保存为组合图
+
+    四张单图仍由各自的 create_* 函数按原尺寸和 dpi 单独导出。
+    """
+    
+    fig = _prepare_figure(fig, (32, 20))
+    fig.set_layout_engine('constrained')
+    subfigs = fig.subfigures(2, 2)
+    
+    for (row, col), draw in COMBINED_PANELS:
+        draw(report, subfigs[row, col])
+    
+    fig.savefig('results/multilang/combined_report.png', dpi=dpi)
+    print("组合报告已保存: results/multilang/combined_report.png")
+
 def main():
     """主函数"""
     
+    parser = argparse.ArgumentParser(description='多语言分析结果可视化')
+    parser.add_argument('--combined', action='store_true',
+                        help='额外生成 2x2 组合报告 combined_report.png（默认关闭，需多渲染一张大图）')
+    args = parser.parse_args()
+    
     print("=" * 60)
     print("多语言分析结果可视化")
     print("=" * 60)
@@ -319,10 +372,15 @@ def main():
     # 生成各种图表
     print("正在生成可视化图表...")
     
-    create_language_ranking_chart(report)
-    create_rules_vs_alignment_scatter(report)
-    create_language_category_analysis(report)
-    create_comprehensive_dashboard(report)
+    # 复用同一个 Figure 依次绘制各图表；组合报告仅在 --combined 时生成
+    fig = plt.figure()
+    create_language_ranking_chart(report, fig)
+    create_rules_vs_alignment_scatter(report, fig)
+    create_language_category_analysis(report, fig)
+    create_comprehensive_dashboard(report, fig)
+    if args.combined:
+        create_combined_report(report, fig)
+    plt.close(fig)
     
     print("\n" + "=" * 60)
     print("所有可视化图表已生成完成！")
@@ -332,6 +390,8 @@ def main():
     print("- results/multilang/rules_vs_alignment_scatter.png") 
     print("- results/multilang/language_category_analysis.png")
     print("- results/multilang/comprehensive_dashboard.png")
+    if args.combined:
+        print("- results/multilang/combined_report.png")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file